@@ -0,0 +1,105 @@
+"""
+Background job-analysis worker.
+
+Drains the analysis queue (postings written by the harvester and postings
+users keep opening) through JobDescriptionAnalyst so the Analyze tab usually
+finds a cached result. Each pass is capped by an estimated token budget;
+whatever is left over waits for the next pass.
+
+    python analysis_worker.py            # one pass
+    python analysis_worker.py --loop     # keep running every PRECOMPUTE_INTERVAL seconds
+
+Like the harvester, it shares SQLite files under data/ with the web app and
+must run on the same host; RUN_BACKGROUND_WORKERS=1 runs it inside the web
+process instead.
+"""
+import argparse
+import time
+
+from job_hunt_assitant.agents.jd_analyst import JobDescriptionAnalyst
+from utils.analysis_queue import get_analysis_queue
+from utils.config import PRECOMPUTE_WORKERS, PRECOMPUTE_RPM, PRECOMPUTE_TOKEN_BUDGET, PRECOMPUTE_INTERVAL
+from utils.job_store import get_job_store
+from utils.llm_scheduler import PRIORITY_BACKGROUND
+from utils.rate_limit import TokenBudget
+
+
+def run_pass(analyst: JobDescriptionAnalyst, token_budget: int | None = PRECOMPUTE_TOKEN_BUDGET,
+             max_workers: int = PRECOMPUTE_WORKERS, requests_per_minute: float = PRECOMPUTE_RPM,
+             batch_size: int = 20) -> dict:
+    """Analyze queued postings until the queue is empty or the pass budget is spent"""
+    queue = get_analysis_queue()
+    store = get_job_store()
+    budget = TokenBudget(token_budget)
+    counts = {"analyzed": 0, "failed": 0, "deferred": 0, "missing": 0}
+
+    while True:
+        job_ids = queue.claim(batch_size)
+        if not job_ids:
+            break
+
+        jobs = store.get_jobs(job_ids)
+        missing = set(job_ids) - {job["id"] for job in jobs}
+        if missing:
+            queue.discard(list(missing))
+            counts["missing"] += len(missing)
+
+        out_of_budget = False
+        for job, analysis in analyst.analyze_jobs_batch(jobs, max_workers, requests_per_minute, token_budget=budget,
+                                                         priority=PRIORITY_BACKGROUND):
+            if analysis.get("skipped"):
+                queue.release(job["id"])
+                counts["deferred"] += 1
+                out_of_budget = True
+            elif "error" in analysis or "critical_error" in analysis:
+                queue.fail(job["id"], analysis.get("error") or analysis.get("critical_error"))
+                counts["failed"] += 1
+            elif not analyst.is_complete(analysis):
+                # Not cached either, so retry on a later pass rather than marking it done
+                queue.fail(job["id"], f"Incomplete analysis: {', '.join(analysis.get('missing_fields', []))}")
+                counts["failed"] += 1
+            else:
+                queue.complete(job["id"])
+                counts["analyzed"] += 1
+        if out_of_budget:
+            break
+
+    print(f"[WORKER] Pass complete — {counts['analyzed']} analyzed, {counts['failed']} failed, "
+          f"{counts['deferred']} deferred, {budget.used} estimated tokens spent; queue: {queue.stats()}")
+    return counts
+
+
+def run_forever(analyst: JobDescriptionAnalyst, interval: int = PRECOMPUTE_INTERVAL,
+                token_budget: int | None = PRECOMPUTE_TOKEN_BUDGET, max_workers: int = PRECOMPUTE_WORKERS,
+                requests_per_minute: float = PRECOMPUTE_RPM) -> None:
+    """Run a pass every ``interval`` seconds; a failed pass is logged and retried on the next one"""
+    while True:
+        try:
+            run_pass(analyst, token_budget, max_workers, requests_per_minute)
+        except Exception as e:
+            print(f"[WORKER] Pass failed: {e}")
+        time.sleep(interval)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-compute job analyses for queued postings")
+    parser.add_argument("--loop", action="store_true", help="keep working every --interval seconds")
+    parser.add_argument("--interval", type=int, default=PRECOMPUTE_INTERVAL, help="seconds between passes")
+    parser.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS, help="concurrent LLM calls")
+    parser.add_argument("--rpm", type=float, default=PRECOMPUTE_RPM, help="LLM requests per minute")
+    parser.add_argument("--token-budget", type=int, default=PRECOMPUTE_TOKEN_BUDGET,
+                        help="estimated tokens to spend per pass (0 for unlimited)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    analyst = JobDescriptionAnalyst()
+    if args.loop:
+        run_forever(analyst, args.interval, args.token_budget or None, args.workers, args.rpm)
+    else:
+        run_pass(analyst, args.token_budget or None, args.workers, args.rpm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Incremental USAJOBS harvester.
+
+Pulls postings for every saved query into the local job store so interactive
+searches can be answered from a warm index. Each run only walks results newer
+than the query's DatePosted watermark, writes only new or changed PositionIDs
+(and queues them for background analysis), and drops postings whose
+ApplicationCloseDate has passed. The similar-jobs index is kept in step.
+
+    python harvester.py                 # one pass over data/saved_queries.json
+    python harvester.py --loop          # keep running every HARVEST_INTERVAL seconds
+    python harvester.py -q "Nurse|Denver, CO"
+
+All state lives in SQLite files under data/, so the harvester must run on the
+same host (and filesystem) as the web app. With RUN_BACKGROUND_WORKERS=1 the
+web app runs this loop in a thread of its own process instead.
+"""
+import argparse
+import json
+import math
+import time
+from datetime import datetime
+
+from usajobs_api import USAJobsAPI
+from utils.analysis_queue import get_analysis_queue
+from utils.config import SAVED_QUERIES_PATH, HARVEST_INTERVAL, HARVEST_MAX_RESULTS
+from utils.job_index import get_job_index
+from utils.job_store import get_job_store
+
+
+def load_saved_queries(path=SAVED_QUERIES_PATH) -> list[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [q for q in json.load(f) if q.get("keyword")]
+    except FileNotFoundError:
+        print(f"No saved queries at {path}")
+        return []
+
+
+def watermark_timestamp(watermark: str, state: dict) -> float:
+    """
+    When the newest harvested posting was published. The DatePosted window is
+    measured from here rather than from last_refreshed, which interactive
+    searches also move forward.
+    """
+    try:
+        return datetime.fromisoformat(watermark[:19]).timestamp()
+    except ValueError:
+        return state["last_refreshed"]
+
+
+def harvest_query(api: USAJobsAPI, store, keyword: str, location: str | None,
+                  max_results: int = HARVEST_MAX_RESULTS, index=None) -> dict:
+    """Sync one saved query (and ``index``, if given); returns the upsert counts"""
+    state = store.get_query_state(keyword, location)
+    watermark = (state or {}).get("watermark") or ""
+    extra_params = None
+    # Only harvests set the watermark; a query that has only been searched interactively
+    # (which also refreshes last_refreshed) still needs a full pull
+    if watermark:
+        days = min(60, max(1, math.ceil((time.time() - watermark_timestamp(watermark, state)) / 86400)))
+        extra_params = {"DatePosted": days}
+
+    # Results are sorted by DatePosted (newest first); fetch pages one at a time
+    # so we can stop as soon as we cross the watermark
+    jobs = []
+    for job in api.iter_jobs(keyword, location, max_results, page_size=100, max_workers=1,
+                             extra_params=extra_params):
+        if watermark and job.get("posted_date", "") < watermark:
+            break
+        jobs.append(job)
+
+    counts = store.upsert_jobs(jobs)
+    if index is not None:
+        index.add_jobs(jobs)
+    if api.last_search_meta:
+        # Remember what the API returned so interactive searches for this query are answered locally
+        store.record_query_results(keyword, location, [j.get("id") for j in jobs], replace=extra_params is None)
+        store.mark_refreshed(keyword, location, max((j.get("posted_date", "") for j in jobs), default=None))
+    print(f"[HARVEST] '{keyword}' in '{location or 'anywhere'}': "
+          f"{counts['inserted']} new, {counts['updated']} updated, {counts['unchanged']} unchanged")
+    return counts
+
+
+def run_once(queries: list[dict]) -> list[str]:
+    """Harvest every query once; returns the PositionIDs that were inserted or updated"""
+    api = USAJobsAPI(use_cache=False)
+    store = get_job_store()
+    # Keep the similar-jobs index warm as well
+    index = get_job_index()
+    changed_ids = []
+    for query in queries:
+        try:
+            counts = harvest_query(api, store, query["keyword"], query.get("location") or None, index=index)
+            changed_ids.extend(counts["changed_ids"])
+        except Exception as e:
+            print(f"[HARVEST] Query '{query.get('keyword')}' failed: {e}")
+
+    expired = store.expire_closed()
+    index.expire_closed()
+    # New and changed postings are analyzed ahead of time by analysis_worker.py
+    get_analysis_queue().enqueue(changed_ids)
+    print(f"[HARVEST] Pass complete — {len(changed_ids)} postings written, {expired} expired, {store.count()} in store")
+    return changed_ids
+
+
+def run_forever(queries: list[dict], interval: int = HARVEST_INTERVAL) -> None:
+    """Harvest every ``interval`` seconds; a failed pass is logged and retried on the next one"""
+    while True:
+        try:
+            run_once(queries)
+        except Exception as e:
+            print(f"[HARVEST] Pass failed: {e}")
+        time.sleep(interval)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sync saved USAJOBS searches into the local job store")
+    parser.add_argument("-q", "--query", action="append", default=[],
+                        help='extra query as "keyword|location" (repeatable)')
+    parser.add_argument("--queries-file", default=str(SAVED_QUERIES_PATH), help="JSON list of saved queries")
+    parser.add_argument("--loop", action="store_true", help="keep harvesting every --interval seconds")
+    parser.add_argument("--interval", type=int, default=HARVEST_INTERVAL, help="seconds between passes")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queries = load_saved_queries(args.queries_file)
+    for raw in args.query:
+        keyword, _, location = raw.partition("|")
+        queries.append({"keyword": keyword.strip(), "location": location.strip()})
+    if not queries:
+        print("[HARVEST] Nothing to do — add queries to the saved queries file or pass -q")
+        return
+
+    if args.loop:
+        run_forever(queries, args.interval)
+    else:
+        run_once(queries)
+
+
+if __name__ == "__main__":
+    main()
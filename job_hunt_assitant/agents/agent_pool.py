@@ -0,0 +1,75 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from utils.config import GEMINI_MODEL, TEMPERATURE
+from job_hunt_assitant.agents.jd_analyst import JobDescriptionAnalyst
+from job_hunt_assitant.agents.resume_cl_agent import ResumeCoverLetterAgent
+
+
+class AgentPool:
+    """
+    Process-wide pool of ready-built agents, keyed by (agent class, model, temperature).
+
+    Building an agent creates the crewai LLM/Agent objects and their HTTP
+    clients, so instances are built once and recycled. An instance is handed
+    to one caller at a time; concurrent sessions get separate instances and
+    the pool grows on demand, keeping at most ``max_idle`` spares per key.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def acquire(self, agent_cls, model: str = GEMINI_MODEL, temperature: float = TEMPERATURE):
+        key = (agent_cls, model, temperature)
+        with self._lock:
+            instance = self._idle[key].pop() if self._idle[key] else None
+            if instance is not None:
+                self.reused += 1
+
+        if instance is None:
+            # Build outside the lock so a slow constructor doesn't block other sessions
+            instance = agent_cls(model=model, temperature=temperature)
+            with self._lock:
+                self.created += 1
+
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                if len(self._idle[key]) < self.max_idle:
+                    self._idle[key].append(instance)
+
+    def prewarm(self, agent_cls, count: int = 1, model: str = GEMINI_MODEL, temperature: float = TEMPERATURE) -> None:
+        """Build ``count`` idle instances ahead of the first request"""
+        instances = [agent_cls(model=model, temperature=temperature) for _ in range(count)]
+        key = (agent_cls, model, temperature)
+        with self._lock:
+            self.created += len(instances)
+            for instance in instances:
+                if len(self._idle[key]) < self.max_idle:
+                    self._idle[key].append(instance)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": sum(len(v) for v in self._idle.values()),
+            }
+
+
+agent_pool = AgentPool()
+
+
+def acquire_analyst(model: str = GEMINI_MODEL, temperature: float = TEMPERATURE):
+    return agent_pool.acquire(JobDescriptionAnalyst, model, temperature)
+
+
+def acquire_writer(model: str = GEMINI_MODEL, temperature: float = TEMPERATURE):
+    return agent_pool.acquire(ResumeCoverLetterAgent, model, temperature)
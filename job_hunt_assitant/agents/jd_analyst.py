@@ -1,41 +1,20 @@
-from crewai import Agent, Task, LLM
+from crewai import Agent, LLM
 from utils.config import GEMINI_API_KEY, GEMINI_MODEL, TEMPERATURE
+from utils.circuit_breaker import FAILURE_API_SHAPE, classify_failure
+from utils.llm_cache import LLMResultCache
+from utils.llm_scheduler import get_llm_scheduler, llm_priority, PRIORITY_BATCH
+from utils.rate_limit import RateLimiter, TokenBudget, estimate_tokens
+from utils.prompt_utils import compact_job_analysis
+from utils.schemas import JobAnalysis, output_text, parse_llm_output, partial_schema
+from job_hunt_assitant.agents.streaming import build_stream_llm, stream_json_fields
+import hashlib
 import json
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import Dict, Any
 
-class JobDescriptionAnalyst:
-    def __init__(self):
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY is not set in config")
-
-       
-        self.llm = LLM(
-            model=GEMINI_MODEL,               
-            api_key=GEMINI_API_KEY,
-            temperature=TEMPERATURE,
-            
-        )
-
-        self.agent = self.create_agent()
-
-    def create_agent(self) -> Agent:
-        return Agent(
-            role='Senior Job Description Analyst',
-            goal='Extract structured requirements and insights from job postings',
-            backstory="""Expert HR professional with 12+ years analyzing federal and private sector job descriptions.
-            Specialized in identifying must-have vs nice-to-have criteria, ATS keywords, and realistic application strategies.
-            You excel at USAJOBS federal postings, understanding qualification summaries, KSAs, and how to match civilian experience.""",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm
-        )
-
-    def analyze_job_description(self, job_description: str, job_title: str, agency: str) -> Dict:
-     try:
-        print(f"[ANALYZER] Starting: {job_title} @ {agency}")
-
-        prompt = f"""You are analyzing this job posting:
+ANALYSIS_PROMPT_TEMPLATE = """You are analyzing this job posting:
 
 JOB TITLE: {job_title}
 AGENCY: {agency}
@@ -75,17 +54,160 @@ Expected output format (copy this structure exactly):
 }}
 """
 
-        # Pass prompt as positional argument (no 'inputs=')
-        raw_result = self.agent.kickoff(prompt)
+# Changes whenever the prompt template is edited, so stale cached analyses are never served
+PROMPT_VERSION = hashlib.sha256(ANALYSIS_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# LLMResultCache namespace holding completed analyses
+ANALYSIS_CACHE_NAMESPACE = "job_analysis"
+
+# Typical size of a completed analysis, used when budgeting batch runs
+ANALYSIS_OUTPUT_TOKENS = 900
+
+FIELD_REPAIR_TEMPLATE = """Complete a partial analysis of this job posting.
+
+JOB TITLE: {job_title}
+AGENCY: {agency}
+
+ANALYSIS SO FAR:
+{analysis}
+{excerpt}
+Provide ONLY these fields:
+{fields}
+
+Return ONLY valid JSON with exactly these keys — no other text, no markdown:
+{skeleton}
+"""
+
+# What each analysis field should contain (mirrors the list in ANALYSIS_PROMPT_TEMPLATE)
+FIELD_DESCRIPTIONS = {
+    "must_have_requirements": "non-negotiable musts (education, years exp, certs, skills)",
+    "preferred_skills": "nice-to-have / desired",
+    "key_responsibilities": "main duties (bullet list)",
+    "company_culture_indicators": "inferred values, environment, work style",
+    "keywords_for_ats": "important phrases/words for ATS",
+    "red_flags": "anything unusual, concerning or high-risk",
+    "positioning_strategy": "2–4 sentences: how applicant should frame experience",
+}
+
+# Fields an analysis is not usable without; an empty value is treated like a missing one
+NON_EMPTY_FIELDS = ("must_have_requirements", "key_responsibilities", "keywords_for_ats", "positioning_strategy")
+# Fields that can be written from the rest of the analysis, without re-sending the posting
+DERIVED_FIELDS = ("positioning_strategy",)
+# Posting text re-sent when a repair needs it; a fraction of the full prompt
+REPAIR_EXCERPT_TOKENS = 1500
+REPAIR_OUTPUT_TOKENS = 300
+
+
+@lru_cache(maxsize=1)
+def get_analysis_cache() -> LLMResultCache:
+    """Shared handle on stored analyses, for lookups that shouldn't build an analyst (LLM + Agent)"""
+    return LLMResultCache(ANALYSIS_CACHE_NAMESPACE)
+
 
-        print(f"[ANALYZER] Raw result length: {len(str(raw_result))}")
+class JobDescriptionAnalyst:
+    # Stale-prompt entries only need purging once per process
+    _stale_cache_purged = False
+
+    def __init__(self, model: str = GEMINI_MODEL, temperature: float = TEMPERATURE, use_cache: bool = True):
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY is not set in config")
 
-        parsed = self._extract_json(str(raw_result))
+        self.model = model
+        self.temperature = temperature
+        self.llm = LLM(
+            model=model,
+            api_key=GEMINI_API_KEY,
+            temperature=temperature,
+        )
+
+        self.agent = self.create_agent()
+        self._stream_llm = None
+
+        self.cache = LLMResultCache(ANALYSIS_CACHE_NAMESPACE) if use_cache else None
+        if self.cache is not None and not JobDescriptionAnalyst._stale_cache_purged:
+            removed = self.cache.invalidate(keep_prompt_version=PROMPT_VERSION)
+            if removed:
+                print(f"[ANALYZER] Dropped {removed} cached analyses from older prompt versions")
+            JobDescriptionAnalyst._stale_cache_purged = True
+
+    def create_agent(self) -> Agent:
+        return Agent(
+            role='Senior Job Description Analyst',
+            goal='Extract structured requirements and insights from job postings',
+            backstory="""Expert HR professional with 12+ years analyzing federal and private sector job descriptions.
+            Specialized in identifying must-have vs nice-to-have criteria, ATS keywords, and realistic application strategies.
+            You excel at USAJOBS federal postings, understanding qualification summaries, KSAs, and how to match civilian experience.""",
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
+
+    @staticmethod
+    def job_text(job: dict) -> str:
+        """Full posting text sent for analysis (shared by single and batch runs so cache keys match)"""
+        return f"{job.get('description', '')}\n\nQualifications:\n{job.get('requirements', '')}"
+
+    def _build_prompt(self, job_description: str, job_title: str, agency: str) -> str:
+        return ANALYSIS_PROMPT_TEMPLATE.format(
+            job_title=job_title,
+            agency=agency,
+            job_description=job_description,
+        )
+
+    @staticmethod
+    def analysis_cache_key(job_description: str, job_title: str, agency: str,
+                           model: str = GEMINI_MODEL, temperature: float = TEMPERATURE) -> str:
+        """Cache key of an analysis, computable without building an analyst (no LLM or Agent)"""
+        return LLMResultCache.make_key(
+            job_description=job_description,
+            job_title=job_title,
+            agency=agency,
+            model=model,
+            temperature=temperature,
+            prompt_version=PROMPT_VERSION,
+        )
+
+    def cache_key(self, job_description: str, job_title: str, agency: str) -> str:
+        return self.analysis_cache_key(job_description, job_title, agency, self.model, self.temperature)
+
+    def get_cached_analysis(self, job_description: str, job_title: str, agency: str) -> Dict | None:
+        """Return a previously stored analysis without calling the LLM"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(job_description, job_title, agency))
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def analyze_job_description(self, job_description: str, job_title: str, agency: str, use_cache: bool = True,
+                                agent: Agent | None = None) -> Dict:
+     try:
+        print(f"[ANALYZER] Starting: {job_title} @ {agency}")
+
+        cache_key = self.cache_key(job_description, job_title, agency)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print("[ANALYZER] Cache hit — skipping LLM call")
+                return cached
+
+        prompt = self._build_prompt(job_description, job_title, agency)
+
+        # Pass prompt as positional argument (no 'inputs='); the schema is enforced by the provider
+        with get_llm_scheduler().slot(estimate_tokens(prompt) + ANALYSIS_OUTPUT_TOKENS):
+            raw_result = output_text((agent or self.agent).kickoff(prompt, response_format=JobAnalysis))
+
+        print(f"[ANALYZER] Raw result length: {len(raw_result)}")
+
+        parsed = self._extract_json(raw_result)
 
         if "error" in parsed:
             print(f"[ANALYZER] Parsing failed → {parsed['error']}")
         else:
             print("[ANALYZER] Successfully parsed JSON")
+            parsed = self.repair_analysis(parsed, job_description, job_title, agency, agent)
+            if self.cache is not None and self.is_complete(parsed):
+                self.cache.set(cache_key, parsed, PROMPT_VERSION)
 
         return parsed
 
@@ -93,31 +215,190 @@ Expected output format (copy this structure exactly):
         print(f"[ANALYZER] Exception: {str(e)}")
         return {"critical_error": str(e), "raw_error_type": type(e).__name__}
 
+    def stream_analysis(self, job_description: str, job_title: str, agency: str, use_cache: bool = True):
+        """
+        Streaming variant of analyze_job_description.
+
+        Yields ``{"done": False, "fields": {...}, ...}`` events as each section
+        of the analysis is completed, then ``{"done": True, "result": analysis}``.
+        Only API-shape failures fall back to the blocking call; other errors end
+        with a ``critical_error`` result, as analyze_job_description would.
+        """
+        cache_key = self.cache_key(job_description, job_title, agency)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print("[ANALYZER] Cache hit — skipping LLM call")
+                yield {"done": True, "result": cached}
+                return
+
+        prompt = self._build_prompt(job_description, job_title, agency)
+        try:
+            if self._stream_llm is None:
+                self._stream_llm = build_stream_llm(self.model, self.temperature)
+            system_prompt = self.agent.backstory + "\n\n" + self.agent.goal
+            with get_llm_scheduler().slot(estimate_tokens(system_prompt + prompt) + ANALYSIS_OUTPUT_TOKENS):
+                raw_result = yield from stream_json_fields(self._stream_llm, system_prompt, prompt, JobAnalysis)
+        except Exception as e:
+            kind = classify_failure(e)
+            if kind != FAILURE_API_SHAPE:
+                # Quota, auth and rejected requests would fail the blocking call too
+                print(f"[ANALYZER] Streaming failed ({kind}), not retrying: {e}")
+                yield {"done": True, "result": {"critical_error": str(e), "raw_error_type": type(e).__name__}}
+                return
+            print(f"[ANALYZER] Streaming failed, falling back to blocking call: {e}")
+            yield {"done": True, "result": self.analyze_job_description(job_description, job_title, agency, use_cache)}
+            return
+
+        parsed = self._extract_json(raw_result)
+        if "error" in parsed:
+            print(f"[ANALYZER] Parsing failed → {parsed['error']}")
+        else:
+            parsed = self.repair_analysis(parsed, job_description, job_title, agency)
+            if self.cache is not None and self.is_complete(parsed):
+                self.cache.set(cache_key, parsed, PROMPT_VERSION)
+        yield {"done": True, "result": parsed}
+
+    def analyze_jobs_batch(self, jobs: list[dict], max_workers: int = 4, requests_per_minute: float = 30,
+                           token_budget: int | TokenBudget | None = None, use_cache: bool = True,
+                           priority: int = PRIORITY_BATCH):
+        """
+        Analyze many postings (e.g. the output of USAJobsAPI.search_jobs) concurrently.
+
+        Yields ``(job, analysis)`` pairs in completion order. Cached analyses are
+        returned without touching the LLM; the rest are rate limited to
+        ``requests_per_minute`` and stop being scheduled once the estimated
+        ``token_budget`` is spent (those jobs yield a ``{"skipped": True, ...}``
+        result). Every successful analysis is written to the cache. Pass a
+        ``TokenBudget`` instead of an int to share one allowance across batches.
+        Calls wait in the process-wide LLM scheduler's ``priority`` lane, behind
+        interactive requests.
+        """
+        limiter = RateLimiter(requests_per_minute)
+        budget = token_budget if isinstance(token_budget, TokenBudget) else TokenBudget(token_budget)
+        local = threading.local()
+
+        def worker_agent() -> Agent:
+            # One crewai Agent per worker thread, all sharing this instance's LLM
+            if not hasattr(local, "agent"):
+                local.agent = self.create_agent()
+            return local.agent
+
+        def run(job: dict) -> tuple[dict, Dict]:
+            job_description = self.job_text(job)
+            job_title = job.get('title', 'Unknown Position')
+            agency = job.get('agency', 'Unknown Agency')
+
+            if use_cache:
+                cached = self.get_cached_analysis(job_description, job_title, agency)
+                if cached is not None:
+                    return job, cached
+
+            tokens = estimate_tokens(self._build_prompt(job_description, job_title, agency)) + ANALYSIS_OUTPUT_TOKENS
+            if not budget.try_spend(tokens):
+                return job, {"error": "Skipped: batch token budget exhausted", "skipped": True}
+
+            limiter.acquire()
+            with llm_priority(priority):
+                return job, self.analyze_job_description(job_description, job_title, agency, use_cache=False,
+                                                         agent=worker_agent())
+
+        print(f"[ANALYZER] Batch analyzing {len(jobs)} postings with {max_workers} workers")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run, job) for job in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+        print(f"[ANALYZER] Batch finished — {budget.used} estimated tokens spent")
+
+    # ── Field repair ─────────────────────────────────
+    @staticmethod
+    def fields_needing_repair(analysis: dict) -> list[str]:
+        """Analysis fields that are missing, failed validation, or are empty but shouldn't be"""
+        fields = [f for f in analysis.get("missing_fields", []) if f in FIELD_DESCRIPTIONS]
+        fields += [f for f in NON_EMPTY_FIELDS if f not in fields and not analysis.get(f)]
+        return fields
+
+    @classmethod
+    def is_complete(cls, analysis: dict) -> bool:
+        """
+        True when no required field is missing or empty. Incomplete analyses
+        are returned but never cached, since cache hits skip repair.
+        """
+        return not any(f in NON_EMPTY_FIELDS for f in cls.fields_needing_repair(analysis))
+
+    def _build_repair_prompt(self, analysis: dict, fields: list[str], job_description: str,
+                             job_title: str, agency: str) -> str:
+        excerpt = ""
+        if any(f not in DERIVED_FIELDS for f in fields):
+            text = " ".join(job_description.split())
+            excerpt = f"\nJOB DESCRIPTION (excerpt):\n{text[: REPAIR_EXCERPT_TOKENS * 4]}\n"
+        skeleton = {f: "" if JobAnalysis.model_fields[f].annotation is str else [] for f in fields}
+        return FIELD_REPAIR_TEMPLATE.format(
+            job_title=job_title,
+            agency=agency,
+            analysis=compact_job_analysis(analysis) or "(nothing usable yet)",
+            excerpt=excerpt,
+            fields="\n".join(f"- {f} → {FIELD_DESCRIPTIONS[f]}" for f in fields),
+            skeleton=json.dumps(skeleton, indent=2),
+        )
+
+    def repair_analysis(self, analysis: dict, job_description: str, job_title: str, agency: str,
+                        agent: Agent | None = None) -> Dict:
+        """
+        Fill missing or invalid fields of a parsed analysis with one small follow-up call.
+
+        Title and agency are filled locally. Any other gaps are re-requested on
+        their own: the prompt carries the analysis so far, plus a capped
+        excerpt of the posting only when a field has to be extracted from it.
+        Whatever comes back valid is merged in. Fields that still fail stay
+        listed under ``missing_fields``.
+        """
+        analysis = dict(analysis)
+        if not analysis.get("job_title"):
+            analysis["job_title"] = job_title
+        if not analysis.get("agency"):
+            analysis["agency"] = agency
+        fields = self.fields_needing_repair(analysis)
+        if not fields:
+            analysis.pop("missing_fields", None)
+            return analysis
+
+        print(f"[ANALYZER] Re-requesting {len(fields)} field(s): {', '.join(fields)}")
+        schema = partial_schema(JobAnalysis, tuple(fields))
+        prompt = self._build_repair_prompt(analysis, fields, job_description, job_title, agency)
+        try:
+            with get_llm_scheduler().slot(estimate_tokens(prompt) + REPAIR_OUTPUT_TOKENS):
+                raw_result = output_text((agent or self.agent).kickoff(prompt, response_format=schema))
+        except Exception as e:
+            print(f"[ANALYZER] Field repair failed: {e}")
+            analysis["missing_fields"] = fields
+            return analysis
+
+        patch = parse_llm_output(raw_result, schema)
+        if "error" in patch:
+            print(f"[ANALYZER] Field repair parsing failed → {patch['error']}")
+            analysis["missing_fields"] = fields
+            return analysis
+        invalid = set(patch.get("missing_fields", []))
+        for f in fields:
+            if f not in invalid and patch.get(f):
+                analysis[f] = patch[f]
+        still_missing = self.fields_needing_repair({**analysis, "missing_fields": list(invalid)})
+        if still_missing:
+            analysis["missing_fields"] = still_missing
+        else:
+            analysis.pop("missing_fields", None)
+        print(f"[ANALYZER] Field repair merged {len(fields) - len(still_missing)}/{len(fields)} field(s)")
+        return analysis
+
     def _extract_json(self, text: str) -> Dict[str, Any]:
-        """Improved robust JSON extraction"""
+        """Parse (repairing if needed) and validate an analysis against the JobAnalysis schema"""
         if not text:
             return {"error": "Empty response from LLM"}
-
-        # Strip common wrappers
-        text = re.sub(r'```(?:json)?\s*|\s*```', '', text, flags=re.IGNORECASE | re.DOTALL)
-        text = text.strip()
-
-        # Find outermost JSON
-        match = re.search(r'\{[\s\S]*\}', text, re.DOTALL)
-        if match:
-            json_str = match.group(0)
-            try:
-                parsed = json.loads(json_str)
-                parsed.setdefault('raw_response', text)  # optional for debugging
-                return parsed
-            except json.JSONDecodeError as e:
-                return {
-                    "error": f"JSON decode failed: {str(e)}",
-                    "raw_snippet": json_str[:400] + "..." if len(json_str) > 400 else json_str,
-                    "raw_full": text[:1200]
-                }
-
-        return {
-            "error": "No JSON object found in response",
-            "raw_response": text[:1500]
-        }
\ No newline at end of file
+        parsed = parse_llm_output(text, JobAnalysis)
+        if parsed.get("missing_fields"):
+            print(f"[ANALYZER] Missing or invalid fields: {', '.join(parsed['missing_fields'])}")
+        if parsed.get("repaired"):
+            print("[ANALYZER] Repaired malformed JSON locally")
+        parsed.setdefault('raw_response', text)  # optional for debugging
+        return parsed
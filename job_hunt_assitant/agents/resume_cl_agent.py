@@ -1,16 +1,85 @@
 from crewai import Agent, Task, LLM
 from langchain_google_genai import ChatGoogleGenerativeAI  # fallback
-from utils.config import GEMINI_API_KEY, GEMINI_MODEL, TEMPERATURE
-import json
-import re
+from utils.config import GEMINI_API_KEY, GEMINI_MODEL, TEMPERATURE, RESUME_CACHE_TTL, RESUME_CACHE_MAXSIZE
+from job_hunt_assitant.agents.streaming import build_stream_llm, stream_json_fields
+from utils.prompt_utils import analysis_keywords, compact_job_analysis
+from utils.rate_limit import estimate_tokens
+from utils.ats_matcher import KeywordMatcher, normalize_keywords
+from utils.resume_parser import ParsedResume, ResumeSection, as_parsed_resume
+from utils.llm_cache import LLMResultCache
+from utils.llm_scheduler import get_llm_scheduler, llm_priority, PRIORITY_BATCH
+from utils.circuit_breaker import FAILURE_API_SHAPE, classify_failure, get_execution_breaker, raised_at_call_site
+from utils.schemas import CoverLetter, TailoredResume, TailoredSections, output_text, parse_llm_output, sections_schema
+from utils.rate_limit import RateLimiter
+from utils.tracking import log_application, save_cover_letter_file, save_tailored_resume_file
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Resume budget for cover-letter prompts; optional sections unrelated to the job are dropped first
+COVER_LETTER_RESUME_TOKENS = 1200
+# Expected response size, reserved in the LLM scheduler alongside the prompt
+RESPONSE_OUTPUT_TOKENS = 1500
+
+SECTION_PROMPT_TEMPLATE = """
+Tailor the resume sections listed under SECTIONS TO REWRITE for the job '{job_title}' at '{agency}' (USAJOBS federal position).
+
+JOB ANALYSIS SUMMARY:
+{analysis}
+
+SECTIONS TO REWRITE:
+{sections}
+
+Instructions:
+1. Rewrite each section on its own; do not repeat the section heading and do not move content between sections.
+2. Prioritize skills/experiences that match the job; rephrase bullets with strong action verbs.
+3. Incorporate exact keywords/phrases from the job analysis where they are truthful for the candidate.
+4. Quantify achievements wherever the original gives numbers; never invent employers, dates, degrees or certifications.
+5. A section whose original text is empty is new: write a 2–4 sentence professional summary targeted to this role.
+6. Keep each section's length similar to the original; plain text, ATS-friendly, "- " for bullets.
+
+Return ONLY valid JSON — no other text, no markdown, no explanations:
+{{
+    "sections": {{
+        "<section id>": {{"text": "rewritten section (use \\n for line breaks)", "keywords_added": ["..."], "changes": "one sentence"}}
+    }}
+}}
+"""
+
+# Changes whenever the section prompt is edited, so stale cached sections are never reused
+SECTION_PROMPT_VERSION = hashlib.sha256(SECTION_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# Analysis fields each section is tailored against; a section is only regenerated when these
+# (or its own text) change, so switching between similar jobs reuses most of the resume
+SECTION_ANALYSIS_FIELDS = {
+    "summary": ("job_title", "must_have_requirements", "keywords_for_ats", "positioning_strategy"),
+    "skills": ("keywords_for_ats", "preferred_skills", "must_have_requirements"),
+    "experience": ("key_responsibilities", "must_have_requirements", "keywords_for_ats"),
+    "projects": ("key_responsibilities", "keywords_for_ats", "preferred_skills"),
+}
+DEFAULT_SECTION_FIELDS = ("keywords_for_ats", "must_have_requirements")
+
+# Factual sections copied through verbatim
+VERBATIM_SECTIONS = ("header", "education", "clearance")
+
+# Tailored sections are resume text too, so they expire like cached resumes; the bound leaves
+# room for each cached resume to be tailored (a handful of sections) to a few dozen jobs
+SECTION_CACHE_MAXSIZE = RESUME_CACHE_MAXSIZE * 200
 
 class ResumeCoverLetterAgent:
-    def __init__(self):
+    # Sections from older prompt versions only need purging once per process
+    _stale_sections_purged = False
+
+    def __init__(self, model: str = GEMINI_MODEL, temperature: float = TEMPERATURE):
+        self.model = model
+        self.temperature = temperature
+
         # Preferred: CrewAI LLM wrapper
         self.llm = LLM(
-            model=GEMINI_MODEL,              # e.g. "gemini/gemini-1.5-flash" or "gemini/gemini-1.5-pro"
+            model=model,                     # e.g. "gemini/gemini-1.5-flash" or "gemini/gemini-1.5-pro"
             api_key=GEMINI_API_KEY,
-            temperature=TEMPERATURE,
+            temperature=temperature,
         )
 
         # Uncomment this fallback if you keep getting LiteLLM / messages validation errors
@@ -22,6 +91,18 @@ class ResumeCoverLetterAgent:
         # )
 
         self.agent = self._create_agent()
+        # Second agent so the cover letter can run alongside resume tailoring
+        self._cover_letter_agent = None
+        # Built on first streaming call
+        self._stream_llm = None
+        # Tailored resume sections, reused while a section and its job inputs are unchanged
+        self.section_cache = LLMResultCache("resume_sections", ttl=RESUME_CACHE_TTL, maxsize=SECTION_CACHE_MAXSIZE)
+        if not ResumeCoverLetterAgent._stale_sections_purged:
+            removed = self.section_cache.invalidate(keep_prompt_version=SECTION_PROMPT_VERSION)
+            removed += self.section_cache.prune()
+            if removed:
+                print(f"Dropped {removed} stale or expired tailored resume sections")
+            ResumeCoverLetterAgent._stale_sections_purged = True
 
     def _create_agent(self) -> Agent:
         return Agent(
@@ -37,49 +118,88 @@ class ResumeCoverLetterAgent:
             llm=self.llm
         )
 
-    def _run_prompt(self, prompt: str, expected: str = "Valid JSON object") -> str:
-        """Unified method to run prompt – tries multiple execution patterns"""
-        try:
+    # Ways of running a prompt, in default order; _run_prompt skips the ones known to be broken
+    EXECUTION_PATHS = ("kickoff", "task", "llm")
+
+    def _execute_path(self, path: str, prompt: str, expected: str, agent: Agent, schema=None) -> str:
+        if path == "kickoff":
             # Preferred: simple kickoff with string
-            result = self.agent.kickoff(prompt)
-            return str(result)
-        except Exception as kickoff_err:
-            print(f"kickoff() failed: {kickoff_err}")
+            return output_text(agent.kickoff(prompt, response_format=schema))
+        if path == "task":
+            # Fallback 1: Use Task.execute()
+            task = Task(
+                description=prompt,
+                agent=agent,
+                expected_output=expected,
+                output_pydantic=schema,
+            )
+            return output_text(task.execute())
+        # Fallback 2: Direct LLM call (most reliable with Gemini)
+        messages = [
+            {"role": "system", "content": agent.backstory + "\n\n" + agent.goal},
+            {"role": "user", "content": prompt}
+        ]
+        # crewai's LLM exposes call(); a langchain chat model exposes invoke()
+        if hasattr(self.llm, "call"):
+            return output_text(self.llm.call(messages, response_model=schema))
+        llm = self.llm.with_structured_output(schema) if schema is not None else self.llm
+        return output_text(llm.invoke(messages))
+
+    def _run_prompt(self, prompt: str, expected: str = "Valid JSON object", agent: Agent | None = None,
+                    schema=None) -> str:
+        """
+        Unified method to run prompt – tries multiple execution patterns.
+
+        Every attempt waits for a slot in the process-wide LLM scheduler. The
+        pattern that last worked in this process is tried first and patterns
+        whose circuit is open are skipped (bar half-open trial calls). Only API-shape failures fall
+        through to the next pattern; transient (429, timeout, 5xx) and
+        permanent (auth, invalid request) errors are raised straight away,
+        since every pattern would hit the same upstream problem. ``schema``
+        (a pydantic model) is passed to the provider's structured-output mode.
+        """
+        agent = agent or self.agent
+        scheduler = get_llm_scheduler()
+        breaker = get_execution_breaker()
+        tokens = estimate_tokens(prompt) + RESPONSE_OUTPUT_TOKENS
+        paths = list(self.EXECUTION_PATHS)
+
+        errors = {}
+        for path in breaker.order(paths):
+            if not breaker.allow(path, paths):
+                continue
             try:
-                # Fallback 1: Use Task.execute()
-                task = Task(
-                    description=prompt,
-                    agent=self.agent,
-                    expected_output=expected
-                )
-                result = task.execute()
-                return str(result)
-            except Exception as task_err:
-                print(f"Task.execute() failed: {task_err}")
-                # Fallback 2: Direct LLM call (most reliable with Gemini)
-                try:
-                    messages = [
-                        {"role": "system", "content": self.agent.backstory + "\n\n" + self.agent.goal},
-                        {"role": "user", "content": prompt}
-                    ]
-                    response = self.llm.invoke(messages)
-                    return response.content if hasattr(response, 'content') else str(response)
-                except Exception as llm_err:
-                    raise RuntimeError(f"All execution methods failed.\n"
-                                     f"kickoff: {kickoff_err}\n"
-                                     f"Task: {task_err}\n"
-                                     f"Direct LLM: {llm_err}")
-
-    def customize_resume(self, resume_text: str, job_analysis: dict) -> dict:
-        prompt = f"""
+                with scheduler.slot(tokens):
+                    result = self._execute_path(path, prompt, expected, agent, schema)
+            except Exception as e:
+                breaker.record_failure(path, e, at_call_site=raised_at_call_site(e, self._execute_path))
+                kind = classify_failure(e)
+                if kind != FAILURE_API_SHAPE:
+                    print(f"{path} failed ({kind}), not trying other methods: {e}")
+                    raise
+                print(f"{path} failed: {e}")
+                errors[path] = e
+                continue
+            breaker.record_success(path)
+            return result
+
+        if not errors:
+            raise RuntimeError(f"All execution methods are temporarily disabled: {breaker.stats()['open']}")
+        raise RuntimeError("All execution methods failed.\n" +
+                           "\n".join(f"{path}: {err}" for path, err in errors.items()))
+
+    def _build_resume_prompt(self, resume_text: str | ParsedResume, job_analysis: dict) -> str:
+        # The whole resume is rewritten, so every section is sent (normalised, without blank-line padding)
+        resume = as_parsed_resume(resume_text)
+        return f"""
 Create a tailored resume for the job '{job_analysis.get("job_title", "Unknown")}' 
 at '{job_analysis.get("agency", "Unknown")}' (USAJOBS federal position).
 
 JOB ANALYSIS SUMMARY:
-{json.dumps(job_analysis, indent=2)}
+{compact_job_analysis(job_analysis)}
 
 ORIGINAL RESUME TEXT:
-{resume_text}
+{resume.prompt_text()}
 
 Instructions:
 1. Identify and prioritize skills/experiences that match job requirements.
@@ -100,26 +220,182 @@ Return ONLY valid JSON — no other text, no markdown, no explanations:
 }}
 """
 
+    def customize_resume(self, resume_text: str | ParsedResume, job_analysis: dict, agent: Agent | None = None) -> dict:
+        prompt = self._build_resume_prompt(resume_text, job_analysis)
+
         try:
-            raw_result = self._run_prompt(prompt, "Valid JSON object with customized resume")
-            return self._parse_json_response(raw_result)
+            raw_result = self._run_prompt(prompt, "Valid JSON object with customized resume", agent, TailoredResume)
+            return self._with_prompt_stats(self._parse_json_response(raw_result, schema=TailoredResume), prompt)
         except Exception as e:
             print(f"Error customizing resume: {e}")
-            return {"error": str(e), "customized_resume": resume_text}
+            return {"error": str(e), "customized_resume": as_parsed_resume(resume_text).text}
+
+    # ── Section-level tailoring ──────────────────────
+    def _section_key(self, section: ResumeSection, job_analysis: dict, resume: ParsedResume) -> str:
+        fields = SECTION_ANALYSIS_FIELDS.get(section.name, DEFAULT_SECTION_FIELDS)
+        return LLMResultCache.make_key(
+            section=section.name,
+            text=section.text,
+            # A section written from scratch draws on the rest of the resume, so key it on all of it
+            resume=None if section.text else resume.hash,
+            analysis={field: job_analysis.get(field) for field in fields},
+            model=self.model,
+            temperature=self.temperature,
+            prompt_version=SECTION_PROMPT_VERSION,
+        )
+
+    @staticmethod
+    def _tailoring_sections(resume: ParsedResume) -> list[ResumeSection]:
+        """Resume sections in output order, with an empty summary added when the resume has none"""
+        sections = list(resume.sections)
+        if not any(s.name == "summary" for s in sections):
+            # Like the one-shot prompt, add a targeted summary below the contact block
+            position = 1 if sections and sections[0].name == "header" else 0
+            sections.insert(position, ResumeSection("summary", "PROFESSIONAL SUMMARY", []))
+        return sections
+
+    def shared_resume_context(self, resume_text: str | ParsedResume, candidate_bio: str = "") -> str:
+        """
+        Job-independent prompt prefix holding the whole resume (sections tagged
+        ``[sN]``) and bio. Batch prompts start with it so every request shares
+        an identical prefix that providers with implicit prompt caching
+        (e.g. Gemini 2.5) can bill at the cached rate.
+        """
+        sections = self._tailoring_sections(as_parsed_resume(resume_text))
+        blocks = "\n\n".join(
+            f"### [s{i}] {section.heading.upper() or section.name.upper()}\n{section.text or '(none — write new)'}"
+            for i, section in enumerate(sections)
+        )
+        return (f"CANDIDATE RESUME (sections tagged [sN]):\n{blocks}\n\n"
+                f"ADDITIONAL BIO (if any):\n{candidate_bio or 'None provided'}\n\n"
+                f"{'=' * 40}\n")
+
+    def _build_section_prompt(self, sections: dict, job_analysis: dict, shared_context: str | None = None) -> str:
+        fields = {f for section in sections.values() for f in SECTION_ANALYSIS_FIELDS.get(section.name, DEFAULT_SECTION_FIELDS)}
+        if shared_context:
+            blocks = "\n".join(
+                f"### [{section_id}] {section.heading.upper() or section.name.upper()} (text in CANDIDATE RESUME above)"
+                for section_id, section in sections.items()
+            )
+        else:
+            blocks = "\n\n".join(
+                f"### [{section_id}] {section.heading.upper() or section.name.upper()}\n{section.text or '(empty — write new)'}"
+                for section_id, section in sections.items()
+            )
+        prompt = SECTION_PROMPT_TEMPLATE.format(
+            job_title=job_analysis.get("job_title", "Unknown"),
+            agency=job_analysis.get("agency", "Unknown"),
+            analysis=compact_job_analysis({k: v for k, v in job_analysis.items() if k in fields}),
+            sections=blocks,
+        )
+        return shared_context + prompt if shared_context else prompt
+
+    def tailor_resume_sections(self, resume_text: str | ParsedResume, job_analysis: dict,
+                               agent: Agent | None = None, use_cache: bool = True,
+                               shared_context: str | None = None, limiter: RateLimiter | None = None) -> dict:
+        """
+        Incremental alternative to customize_resume.
+
+        Each section is tailored against only the analysis fields relevant to
+        it and cached under (section text, those fields, model, prompt
+        version); a section written from scratch (the added summary) is also
+        keyed on the whole resume. Only sections whose inputs changed since they were last
+        tailored are sent to the LLM — all of them in one call — so editing a
+        single section, or switching to a similar job, regenerates a fraction
+        of the resume. Returns the customize_resume fields plus
+        ``sections_regenerated`` and ``sections_reused``. Pass
+        ``shared_context`` (from shared_resume_context) to reference sections
+        by id instead of repeating their text. ``limiter`` is only acquired
+        when a section actually has to go to the LLM.
+        """
+        resume = as_parsed_resume(resume_text)
+        sections = self._tailoring_sections(resume)
+
+        tailored, stale, reused = {}, {}, []
+        for i, section in enumerate(sections):
+            if section.name in VERBATIM_SECTIONS:
+                tailored[i] = {"text": section.text}
+                continue
+            cached = self.section_cache.get(self._section_key(section, job_analysis, resume)) if use_cache else None
+            if cached is not None:
+                tailored[i] = cached
+                reused.append(section.heading or section.name)
+            else:
+                stale[f"s{i}"] = section
 
-    def generate_cover_letter(self, resume_text: str, job_analysis: dict, candidate_bio: str = "") -> dict:
+        prompt_tokens = 0
+        if stale:
+            prompt = self._build_section_prompt(stale, job_analysis, shared_context)
+            prompt_tokens = estimate_tokens(prompt)
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                raw_result = self._run_prompt(prompt, "Valid JSON object with rewritten sections", agent,
+                                              sections_schema(tuple(stale)))
+                parsed = self._parse_json_response(raw_result, schema=TailoredSections)
+            except Exception as e:
+                print(f"Error tailoring resume sections: {e}")
+                parsed = {"error": str(e)}
+            rewritten = parsed.get("sections") if isinstance(parsed.get("sections"), dict) else {}
+            for section_id, section in stale.items():
+                result = rewritten.get(section_id)
+                if isinstance(result, str):
+                    result = {"text": result}
+                if not isinstance(result, dict) or not str(result.get("text", "")).strip():
+                    # Keep the original wording rather than dropping the section
+                    tailored[int(section_id[1:])] = {"text": section.text, "failed": True}
+                    continue
+                tailored[int(section_id[1:])] = result
+                self.section_cache.set(self._section_key(section, job_analysis, resume), result, SECTION_PROMPT_VERSION)
+
+        blocks, keywords_added, changes, failed = [], [], [], []
+        for i, section in enumerate(sections):
+            result = tailored[i]
+            text = str(result.get("text", "")).strip()
+            if not text:
+                continue
+            blocks.append(f"{section.heading.upper()}\n{text}" if section.heading else text)
+            keywords_added.extend(k for k in result.get("keywords_added", []) if k not in keywords_added)
+            if result.get("changes"):
+                changes.append(f"{section.heading or section.name}: {result['changes']}")
+            if result.get("failed"):
+                failed.append(section.heading or section.name)
+
+        regenerated = [s.heading or s.name for s in stale.values()]
+        print(f"Resume sections: {len(regenerated)} regenerated, {len(reused)} reused, ~{prompt_tokens} prompt tokens")
+        output = {
+            "customized_resume": "\n\n".join(blocks),
+            "summary_of_changes": "\n".join(changes),
+            "keywords_added": keywords_added,
+            "sections_regenerated": regenerated,
+            "sections_reused": reused,
+            "prompt_tokens": prompt_tokens,
+        }
+        if failed:
+            output["sections_failed"] = failed
+            if len(failed) == len(regenerated) and stale:
+                output["error"] = f"Section tailoring failed; original text kept for: {', '.join(failed)}"
+        return output
+
+    def _build_cover_letter_prompt(self, resume_text: str | ParsedResume, job_analysis: dict,
+                                   candidate_bio: str = "", shared_context: str | None = None) -> str:
+        if shared_context:
+            # Resume and bio are already in the shared prefix
+            candidate = "CANDIDATE RESUME AND BIO: see above."
+        else:
+            # A letter only draws on the parts of the resume that match the job
+            resume = as_parsed_resume(resume_text)
+            relevant_resume = resume.prompt_text(analysis_keywords(job_analysis), max_tokens=COVER_LETTER_RESUME_TOKENS)
+            candidate = (f"CANDIDATE RESUME (sections relevant to this job):\n{relevant_resume}\n\n"
+                         f"ADDITIONAL BIO (if any):\n{candidate_bio or 'None provided'}")
         prompt = f"""
 Generate a professional federal-style cover letter for '{job_analysis.get("job_title", "Unknown")}' 
 at '{job_analysis.get("agency", "Unknown")}'.
 
 JOB ANALYSIS SUMMARY:
-{json.dumps(job_analysis, indent=2)}
-
-CANDIDATE RESUME:
-{resume_text}
+{compact_job_analysis(job_analysis)}
 
-ADDITIONAL BIO (if any):
-{candidate_bio or "None provided"}
+{candidate}
 
 Requirements:
 - Address to 'Dear Hiring Manager' or appropriate panel if known.
@@ -138,34 +414,260 @@ Return ONLY valid JSON — no other text, no markdown, no explanations:
     "recommended_modifications": ["optional tweak 1", "..."]
 }}
 """
+        return shared_context + prompt if shared_context else prompt
+
+    def generate_cover_letter(self, resume_text: str | ParsedResume, job_analysis: dict, candidate_bio: str = "",
+                              agent: Agent | None = None, shared_context: str | None = None) -> dict:
+        prompt = self._build_cover_letter_prompt(resume_text, job_analysis, candidate_bio, shared_context)
 
         try:
-            raw_result = self._run_prompt(prompt, "Valid JSON object with cover letter")
-            return self._parse_json_response(raw_result)
+            raw_result = self._run_prompt(prompt, "Valid JSON object with cover letter", agent, CoverLetter)
+            return self._with_prompt_stats(self._parse_json_response(raw_result, schema=CoverLetter), prompt)
         except Exception as e:
             print(f"Error generating cover letter: {e}")
             return {"error": str(e), "cover_letter": "Error occurred"}
 
-    def _parse_json_response(self, result: str, default_key: str = "result") -> dict:
+    def generate_application_package(self, resume_text: str | ParsedResume, job_analysis: dict,
+                                     keywords: list[str] | None = None, candidate_bio: str = "") -> dict:
+        """
+        Tailor the resume (section by section, see tailor_resume_sections), write
+        the cover letter and score ATS compatibility concurrently.
+
+        The two LLM calls are independent, so they run side by side on separate
+        crewai Agents (sharing this instance's LLM) and the wall-clock cost is
+        roughly the slower of the two rather than their sum. The resume is
+        parsed once and the structured form is shared by all three steps.
+        """
+        resume_text = as_parsed_resume(resume_text)
+        if keywords is None:
+            keywords = job_analysis.get("keywords_for_ats", [])
+        if self._cover_letter_agent is None:
+            self._cover_letter_agent = self._create_agent()
+
+        def timed(fn, *args, **kwargs):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            return result, round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            resume_future = executor.submit(timed, self.tailor_resume_sections, resume_text, job_analysis,
+                                            agent=self.agent)
+            cover_future = executor.submit(timed, self.generate_cover_letter, resume_text, job_analysis, candidate_bio,
+                                           agent=self._cover_letter_agent)
+            ats_future = executor.submit(timed, self.analyze_resume_ats_compatibility, resume_text, keywords)
+
+            resume_res, resume_time = resume_future.result()
+            cover_res, cover_time = cover_future.result()
+            ats_res, ats_time = ats_future.result()
+
+        timings = {
+            "customize_resume": resume_time,
+            "generate_cover_letter": cover_time,
+            "ats_analysis": ats_time,
+            "total": round(time.perf_counter() - start, 2),
+        }
+        print(f"Application package generated in {timings['total']}s "
+              f"(resume {resume_time}s, cover letter {cover_time}s)")
+
+        return {
+            "tailored_resume": resume_res,
+            "cover_letter": cover_res,
+            "ats_analysis": ats_res,
+            "timings": timings,
+        }
+
+    def generate_packages_batch(self, resume_text: str | ParsedResume, jobs_with_analyses: list[tuple[dict, dict]],
+                                candidate_bio: str = "", max_workers: int = 3, requests_per_minute: float = 20,
+                                save: bool = True):
+        """
+        Generate application packages for one resume against many analyzed postings.
+
+        Yields ``(job, package)`` pairs in completion order, so callers can
+        report per-job progress. The resume is parsed once; every prompt starts
+        with the same shared_resume_context prefix, and the first job runs on
+        its own so the provider has cached that prefix before the remaining
+        jobs run concurrently (``max_workers`` threads, at most
+        ``requests_per_minute`` LLM calls, queued in the scheduler's batch
+        lane behind interactive requests). With ``save`` each package is
+        written via utils.tracking and logged with status "generated"; the
+        file paths are returned under ``package["files"]``.
+        """
+        resume = as_parsed_resume(resume_text)
+        shared_context = self.shared_resume_context(resume, candidate_bio)
+        limiter = RateLimiter(requests_per_minute)
+        local = threading.local()
+        save_lock = threading.Lock()
+
+        def worker_agent() -> Agent:
+            # One crewai Agent per worker thread, all sharing this instance's LLM
+            if not hasattr(local, "agent"):
+                local.agent = self._create_agent()
+            return local.agent
+
+        def run(job: dict, job_analysis: dict) -> tuple[dict, dict]:
+            start = time.perf_counter()
+            with llm_priority(PRIORITY_BATCH):
+                resume_res = self.tailor_resume_sections(resume, job_analysis, agent=worker_agent(),
+                                                         shared_context=shared_context, limiter=limiter)
+                limiter.acquire()
+                cover_res = self.generate_cover_letter(resume, job_analysis, candidate_bio, agent=worker_agent(),
+                                                       shared_context=shared_context)
+            package = {
+                "tailored_resume": resume_res,
+                "cover_letter": cover_res,
+                "ats_analysis": self.analyze_resume_ats_compatibility(resume, job_analysis.get("keywords_for_ats", [])),
+                "timings": {"total": round(time.perf_counter() - start, 2)},
+            }
+            if save:
+                try:
+                    with save_lock:
+                        package["files"] = self._save_package(job, job_analysis, package)
+                except OSError as e:
+                    print(f"Could not save package for {job.get('title', '')}: {e}")
+            return job, package
+
+        print(f"Generating {len(jobs_with_analyses)} application packages with {max_workers} workers")
+        if not jobs_with_analyses:
+            return
+        # Warm the provider's prompt cache with the shared prefix before fanning out
+        yield run(*jobs_with_analyses[0])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run, job, job_analysis) for job, job_analysis in jobs_with_analyses[1:]]
+            for future in as_completed(futures):
+                yield future.result()
+
+    @staticmethod
+    def _save_package(job: dict, job_analysis: dict, package: dict) -> dict:
+        title = job.get("title") or job_analysis.get("job_title", "Unknown")
+        agency = job.get("agency") or job_analysis.get("agency", "Unknown")
+        job_id = str(job.get("id") or "")
+        files = {}
+        resume_res, cover_res = package["tailored_resume"], package["cover_letter"]
+        if resume_res.get("customized_resume") and "error" not in resume_res:
+            files["resume"] = save_tailored_resume_file(resume_res["customized_resume"], title, agency, job_id)
+        if cover_res.get("cover_letter") and "error" not in cover_res:
+            files["cover_letter"] = save_cover_letter_file(cover_res["cover_letter"], title, agency, job_id)
+        if files:
+            log_application(job_id, title, agency, resume_res.get("summary_of_changes", ""),
+                            files.get("cover_letter", ""), status="generated")
+        return files
+
+    # ── Streaming ────────────────────────────────────
+    def _stream_prompt(self, prompt: str, fallback, schema=None, on_error=None):
+        """
+        Stream ``prompt`` and yield partial-field events, finishing with
+        ``{"done": True, "result": parsed_dict}``. If the streaming path itself
+        doesn't work (an API-shape failure) the blocking ``fallback()`` result
+        is yielded instead; any other failure would hit the blocking call too,
+        so it ends with ``on_error(exception)`` without calling the LLM again.
+        """
         try:
-            # Clean up common wrappers
-            result = result.strip()
-            result = re.sub(r'^```json\s*|\s*```$', '', result, flags=re.IGNORECASE | re.DOTALL)
-            result = result.strip()
-
-            json_match = re.search(r'\{[\s\S]*\}', result)
-            if json_match:
-                json_str = json_match.group(0)
-                parsed = json.loads(json_str)
-                parsed['raw_response'] = result
-                return parsed
+            if self._stream_llm is None:
+                self._stream_llm = build_stream_llm(self.model, self.temperature)
+            system_prompt = self.agent.backstory + "\n\n" + self.agent.goal
+            with get_llm_scheduler().slot(estimate_tokens(system_prompt + prompt) + RESPONSE_OUTPUT_TOKENS):
+                raw_result = yield from stream_json_fields(self._stream_llm, system_prompt, prompt, schema)
+        except Exception as e:
+            kind = classify_failure(e)
+            if kind != FAILURE_API_SHAPE:
+                print(f"Streaming failed ({kind}), not retrying: {e}")
+                yield {"done": True, "result": on_error(e) if on_error is not None else {"error": str(e)}}
+                return
+            print(f"Streaming failed, falling back to blocking call: {e}")
+            yield {"done": True, "result": fallback()}
+            return
+        yield {"done": True, "result": self._with_prompt_stats(self._parse_json_response(raw_result, schema=schema), prompt)}
+
+    def stream_customize_resume(self, resume_text: str | ParsedResume, job_analysis: dict):
+        """Streaming variant of customize_resume; see _stream_prompt for the event format"""
+        prompt = self._build_resume_prompt(resume_text, job_analysis)
+        yield from self._stream_prompt(
+            prompt, lambda: self.customize_resume(resume_text, job_analysis), TailoredResume,
+            lambda e: {"error": str(e), "customized_resume": as_parsed_resume(resume_text).text},
+        )
+
+    def stream_cover_letter(self, resume_text: str | ParsedResume, job_analysis: dict, candidate_bio: str = ""):
+        """Streaming variant of generate_cover_letter; see _stream_prompt for the event format"""
+        prompt = self._build_cover_letter_prompt(resume_text, job_analysis, candidate_bio)
+        yield from self._stream_prompt(
+            prompt, lambda: self.generate_cover_letter(resume_text, job_analysis, candidate_bio), CoverLetter,
+            lambda e: {"error": str(e), "cover_letter": "Error occurred"},
+        )
+
+    def stream_application_package(self, resume_text: str | ParsedResume, job_analysis: dict,
+                                   keywords: list[str] | None = None, candidate_bio: str = ""):
+        """
+        Like generate_application_package, but streams the cover letter.
+
+        Resume tailoring and ATS scoring run in the background while cover-letter
+        events are yielded from the caller's thread (so UI frameworks can render
+        them). The final event is ``{"done": True, "result": package}``.
+        """
+        resume_text = as_parsed_resume(resume_text)
+        if keywords is None:
+            keywords = job_analysis.get("keywords_for_ats", [])
 
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def timed_resume():
+                step_start = time.perf_counter()
+                result = self.tailor_resume_sections(resume_text, job_analysis)
+                return result, round(time.perf_counter() - step_start, 2)
+
+            resume_future = executor.submit(timed_resume)
+
+            ats_start = time.perf_counter()
+            ats_res = self.analyze_resume_ats_compatibility(resume_text, keywords)
+            ats_time = round(time.perf_counter() - ats_start, 2)
+
+            cover_start = time.perf_counter()
+            cover_res = None
+            for event in self.stream_cover_letter(resume_text, job_analysis, candidate_bio):
+                if event["done"]:
+                    cover_res = event["result"]
+                else:
+                    yield event
+            cover_time = round(time.perf_counter() - cover_start, 2)
+
+            resume_res, resume_time = resume_future.result()
+
+        timings = {
+            "customize_resume": resume_time,
+            "generate_cover_letter": cover_time,
+            "ats_analysis": ats_time,
+            "total": round(time.perf_counter() - start, 2),
+        }
+        yield {
+            "done": True,
+            "result": {
+                "tailored_resume": resume_res,
+                "cover_letter": cover_res,
+                "ats_analysis": ats_res,
+                "timings": timings,
+            },
+        }
+
+    def _with_prompt_stats(self, result: dict, prompt: str) -> dict:
+        """Attach the estimated prompt size so callers can track input-token spend"""
+        result["prompt_tokens"] = estimate_tokens(prompt)
+        print(f"Prompt size: ~{result['prompt_tokens']} tokens")
+        return result
+
+    def _parse_json_response(self, result: str, default_key: str = "result", schema=None) -> dict:
+        """Single local pass: repair malformed/truncated JSON, then validate against ``schema`` if given"""
+        parsed = parse_llm_output(result, schema)
+        if "error" in parsed:
+            result = (result or "").strip()
             return {default_key: result, "raw_response": result, "note": "Response was not pure JSON"}
-        except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
-            return {"error": f"JSON parse failed: {str(e)}", "raw_response": result[:1500]}
+        if parsed.get("missing_fields"):
+            print(f"Missing or invalid fields: {', '.join(parsed['missing_fields'])}")
+        parsed['raw_response'] = result
+        return parsed
 
-    def analyze_resume_ats_compatibility(self, resume_text: str, keywords: list[str]) -> dict:
+    def analyze_resume_ats_compatibility(self, resume_text: str | ParsedResume, keywords: list[str]) -> dict:
+        # Same keyword normalization as the vectorized scorer used for the job list
+        keywords = normalize_keywords(keywords)
         if not keywords:
             return {
                 "ats_score": 0,
@@ -177,29 +679,26 @@ Return ONLY valid JSON — no other text, no markdown, no explanations:
 
         ats_score = 0
         max_score = len(keywords) * 2
-        resume_lower = resume_text.lower()
         keywords_found = []
         keywords_missing = []
 
-        for k in keywords:
-            k_lower = k.lower()
-            if k_lower in resume_lower:
-                ats_score += 2
+        # Word-boundary, stemmed matching against the parsed resume's precomputed token index
+        resume = as_parsed_resume(resume_text)
+        for k, score in KeywordMatcher(keywords).match(resume.index):
+            ats_score += score
+            if score == 2:
                 keywords_found.append(k)
+            elif score == 1:
+                keywords_found.append(f"{k} (partial match)")
             else:
-                parts = k_lower.split()
-                if len(parts) > 1 and all(part in resume_lower for part in parts):
-                    ats_score += 1
-                    keywords_found.append(f"{k} (partial match)")
-                else:
-                    keywords_missing.append(k)
+                keywords_missing.append(k)
 
         ats_percentage = (ats_score / max_score * 100) if max_score > 0 else 0
 
         suggestions = []
         if ats_percentage < 60:
             suggestions.append(f"Add the {len(keywords_missing)} missing keywords/phrases to significantly improve ATS pass rate.")
-        if len(resume_text.split()) > 800:
+        if resume.word_count > 800:
             suggestions.append("Shorten resume to 1-2 pages for better ATS & human readability.")
 
         return {
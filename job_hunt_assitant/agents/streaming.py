@@ -0,0 +1,54 @@
+from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.config import GEMINI_API_KEY
+from utils.json_stream import IncrementalJSONParser
+
+
+def build_stream_llm(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """
+    Chat model used for token streaming (crewai's kickoff only returns the finished text).
+
+    Every streamed prompt expects a JSON object, so Gemini's JSON output mode
+    is switched on; the schema for each prompt is passed per call in
+    stream_json_fields, and values are validated again after the stream ends.
+    """
+    return ChatGoogleGenerativeAI(
+        model=model.replace("gemini/", ""),
+        google_api_key=GEMINI_API_KEY,
+        temperature=temperature,
+        response_mime_type="application/json",
+    )
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+def stream_json_fields(llm: ChatGoogleGenerativeAI, system_prompt: str, prompt: str, schema=None):
+    """
+    Stream a JSON-producing prompt, yielding progress events as fields fill in.
+
+    ``schema`` (a pydantic model) is sent as the response JSON schema, so the
+    provider enforces the output shape while it streams.
+
+    Each event is ``{"done": False, "fields": {...}, "partial_key": str | None, "text": str}``
+    where ``fields`` holds completed top-level values plus the growing prefix
+    of the string currently being written. The generator's return value
+    (``StopIteration.value``) is the full raw response text.
+    """
+    parser = IncrementalJSONParser()
+    kwargs = {"response_json_schema": schema.model_json_schema()} if schema is not None else {}
+    for chunk in llm.stream([("system", system_prompt), ("human", prompt)], **kwargs):
+        text = _chunk_text(chunk)
+        if not text:
+            continue
+        parser.feed(text)
+        yield {
+            "done": False,
+            "fields": dict(parser.fields),
+            "partial_key": parser.partial_key,
+            "text": parser.buffer,
+        }
+    return parser.buffer
@@ -1,14 +1,22 @@
 import streamlit as st
 import pandas as pd
-import pdfplumber
 import json
 from typing import Dict
 import os
+import threading
 # Your custom modules (adjust paths as needed)
-from utils.config import GEMINI_API_KEY, USAJOBS_API_KEY
+from utils.config import GEMINI_API_KEY, USAJOBS_API_KEY, RUN_BACKGROUND_WORKERS
 from usajobs_api import USAJobsAPI
-from job_hunt_assitant.agents.jd_analyst import JobDescriptionAnalyst
-from job_hunt_assitant.agents.resume_cl_agent import ResumeCoverLetterAgent
+from job_hunt_assitant.agents.jd_analyst import JobDescriptionAnalyst, get_analysis_cache
+from job_hunt_assitant.agents.agent_pool import acquire_analyst, acquire_writer
+from utils.ats_matcher import extract_job_keywords, score_resume_against_jobs
+from utils.semantic_match import get_semantic_matcher
+from utils.job_index import get_job_index, index_in_background
+from utils.job_store import get_job_store
+from utils.analysis_queue import get_analysis_queue
+from utils.resume_ingest import content_hash, ingest_resume_pdf
+from utils.resume_parser import parse_resume
+from utils.llm_scheduler import get_llm_scheduler
 
 
 
@@ -724,7 +732,10 @@ def initialize_session_state():
         'resume_text': "",
         'tailored_resume': None,
         'cover_letter': None,
-        'resume_analys': None
+        'resume_analys': None,
+        'batch_analyses': {},
+        'batch_packages': {},
+        'resume_hash': None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -733,6 +744,55 @@ def initialize_session_state():
 # Initialize session state immediately
 initialize_session_state()
 
+def sync_resume_editor():
+    """Keep edits made in the resume editor; only the edited sections are re-tailored later"""
+    edited = st.session_state.get("resume_editor", "").strip()
+    if edited:
+        st.session_state.resume_text = edited
+
+def lookup_precomputed_analysis(job: Dict) -> Dict | None:
+    """Analysis already produced for this posting (by the background worker or an earlier session)"""
+    try:
+        return get_analysis_cache().get(JobDescriptionAnalyst.analysis_cache_key(
+            JobDescriptionAnalyst.job_text(job),
+            job.get('title', 'Unknown Position'),
+            job.get('agency', 'Unknown Agency')
+        ))
+    except Exception as e:
+        print(f"Cached analysis lookup failed: {e}")
+        return None
+
+# Every posting fetched from USAJOBS is added to the local similar-jobs index in the background
+USAJobsAPI.add_job_listener(index_in_background)
+
+
+@st.cache_resource
+def start_background_workers() -> list:
+    """
+    Run the harvester and analysis worker loops in daemon threads, once per
+    process. They share the job store, analysis queue and LLM scheduler with
+    the app through SQLite files under data/, so they have to live on the
+    same filesystem.
+    """
+    import analysis_worker
+    import harvester
+
+    threads = []
+    queries = harvester.load_saved_queries()
+    if queries and USAJOBS_API_KEY:
+        threads.append(threading.Thread(target=harvester.run_forever, args=(queries,),
+                                        name="harvester", daemon=True))
+    if GEMINI_API_KEY:
+        threads.append(threading.Thread(target=lambda: analysis_worker.run_forever(JobDescriptionAnalyst()),
+                                        name="analysis-worker", daemon=True))
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+if RUN_BACKGROUND_WORKERS:
+    start_background_workers()
+
 # ────────────────────────────────────────────────
 # Main App
 # ────────────────────────────────────────────────
@@ -823,13 +883,13 @@ def main():
             keyword = st.text_input(
                 "🔎 Keyword / Position Title", 
                 value="Software Engineer",
-                help="Enter job title, keywords, or skills you're looking for"
+                help="Enter job title, keywords, or skills you're looking for; separate several with ';' to search them all"
             )
         with col2:
             location = st.text_input(
                 "📍 Location / Remote", 
                 value="",
-                help="Enter city, state, or leave blank for all locations"
+                help="Enter city, state, or leave blank for all locations; separate several with ';'"
             )
         with col3:
             max_results = st.number_input(
@@ -838,19 +898,53 @@ def main():
                 max_value=50, 
                 value=15, 
                 step=5,
-                help="Number of jobs to retrieve"
+                help="Number of jobs to retrieve (per keyword/location pair when searching several)"
             )
 
+        use_local_index = st.checkbox(
+            "⚡ Serve repeat searches from the local job index",
+            value=True,
+            help="Recently refreshed searches are answered offline; only new postings are fetched from USAJOBS"
+        )
+
         # Search Button
         if st.button("🔍 Search USAJOBS", type="primary", use_container_width=True):
             if not USAJOBS_API_KEY:
                 st.error("❌ USAJOBS API key missing. Please add it to utils/config.py")
             else:
+                jobs = []
                 with st.spinner("🔄 Searching for opportunities..."):
                     try:
                         api = USAJobsAPI()
-                        jobs = api.search_jobs(keyword.strip(), location.strip() or None, max_results)
+                        # Stream pages in as they arrive so the first results show immediately
+                        preview = st.empty()
+                        streamed = []
+
+                        def show_preview(job):
+                            streamed.append(job)
+                            preview.markdown("\n".join(
+                                f"- **{j.get('title', 'Unknown Title')}** — {j.get('agency', 'Unknown Agency')}"
+                                for j in streamed
+                            ))
+
+                        keywords = [k.strip() for k in keyword.split(";") if k.strip()]
+                        locations = [l.strip() for l in location.split(";") if l.strip()] or [None]
+                        queries = [(k, l) for k in keywords for l in locations]
+                        if len(queries) > 1:
+                            # Several searches at once: fan out concurrently and merge, deduped by PositionID
+                            jobs = api.search_many(queries, results_per_page=max_results)
+                        elif use_local_index:
+                            jobs = get_job_store().search_with_refresh(
+                                api, keyword.strip(), location.strip() or None, max_results, on_job=show_preview
+                            )
+                        else:
+                            for job in api.iter_jobs(keyword.strip(), location.strip() or None, max_results):
+                                show_preview(job)
+                            jobs = streamed
+                        preview.empty()
                         st.session_state.jobs_data = jobs
+                        st.session_state.batch_analyses = {}
+                        st.session_state.batch_packages = {}
                     except Exception as e:
                         st.error(f"❌ Search failed: {str(e)}")
                         st.session_state.jobs_data = []
@@ -864,10 +958,95 @@ def main():
         if st.session_state.jobs_data:
             st.markdown("---")
             st.markdown("### 📋 Matching Positions")
-            
-            for idx, job in enumerate(st.session_state.jobs_data):
+
+            # Batch analysis of every result
+            if st.button("⚡ Analyze All Results", use_container_width=True, key="batch_analyze"):
+                if not GEMINI_API_KEY:
+                    st.error("❌ Gemini API key missing. Please add it to utils/config.py")
+                else:
+                    jobs = st.session_state.jobs_data
+                    progress = st.progress(0.0, text="🤖 Analyzing all positions...")
+                    try:
+                        with acquire_analyst() as analyst:
+                            for done, (batch_job, batch_analysis) in enumerate(analyst.analyze_jobs_batch(jobs), 1):
+                                st.session_state.batch_analyses[batch_job.get('id')] = batch_analysis
+                                progress.progress(done / len(jobs), text=f"✅ {done}/{len(jobs)} — {batch_job.get('title', '')}")
+                    except Exception as e:
+                        st.error(f"❌ Batch analysis failed: {str(e)}")
+                    progress.empty()
+
+            # Tailored resume + cover letter for every analyzed result, saved to data/ and logged
+            analyzed = [
+                (job, st.session_state.batch_analyses[job.get('id')])
+                for job in st.session_state.jobs_data
+                if job.get('id') in st.session_state.batch_analyses
+                and "error" not in st.session_state.batch_analyses[job.get('id')]
+                and "critical_error" not in st.session_state.batch_analyses[job.get('id')]
+            ]
+            if analyzed and st.session_state.resume_text:
+                if st.button(f"📦 Generate Packages for {len(analyzed)} Analyzed Jobs", use_container_width=True,
+                             key="batch_packages"):
+                    progress = st.progress(0.0, text="✍️ Generating application packages...")
+                    saved, failed = 0, []
+                    try:
+                        with acquire_writer() as writer:
+                            packages = writer.generate_packages_batch(parse_resume(st.session_state.resume_text), analyzed)
+                            for done, (batch_job, package) in enumerate(packages, 1):
+                                st.session_state.batch_packages[batch_job.get('id')] = package
+                                if "error" in package["tailored_resume"] or "error" in package["cover_letter"]:
+                                    failed.append(batch_job.get('title', 'Unknown Title'))
+                                else:
+                                    saved += 1
+                                progress.progress(done / len(analyzed), text=f"✅ {done}/{len(analyzed)} — {batch_job.get('title', '')}")
+                    except Exception as e:
+                        st.error(f"❌ Package generation failed: {str(e)}")
+                    if saved:
+                        st.success(f"✅ Saved {saved} packages to the data folder and the applications log")
+                    if failed:
+                        st.warning(f"⚠️ {len(failed)} packages could not be generated: {', '.join(failed)}")
+                    progress.empty()
+
+            # ATS fit of the current resume against every result (analyst keywords when available)
+            fit_scores = {}
+            semantic_scores = {}
+            ordered_jobs = list(enumerate(st.session_state.jobs_data))
+            sort_by = "Newest first"
+            if st.session_state.resume_text:
+                job_keywords = []
+                for job in st.session_state.jobs_data:
+                    job_analysis = st.session_state.batch_analyses.get(job.get('id')) or {}
+                    job_keywords.append(
+                        job_analysis.get("keywords_for_ats")
+                        or extract_job_keywords(JobDescriptionAnalyst.job_text(job))
+                    )
+                parsed_resume = parse_resume(st.session_state.resume_text)
+                scores = score_resume_against_jobs(parsed_resume.index, job_keywords)
+                fit_scores = {idx: score["ats_percentage"] for idx, score in enumerate(scores)}
+
+                # Semantic similarity (local embeddings, no LLM calls)
+                position = {id(job): idx for idx, job in ordered_jobs}
+                ranked = get_semantic_matcher().rank_jobs(parsed_resume, st.session_state.jobs_data)
+                semantic_scores = {position[id(job)]: round(sim * 100, 1) for job, sim in ranked}
+
+                sort_by = st.selectbox(
+                    "📈 Sort results by",
+                    ["Newest first", "ATS keyword fit", "Semantic match"],
+                    key="sort_results_by"
+                )
+                if sort_by == "ATS keyword fit":
+                    ordered_jobs.sort(key=lambda item: fit_scores.get(item[0], 0), reverse=True)
+                elif sort_by == "Semantic match":
+                    ordered_jobs.sort(key=lambda item: semantic_scores.get(item[0], 0), reverse=True)
+            if sort_by == "Newest first":
+                # Searches answered from the local store come back in relevance order
+                ordered_jobs.sort(key=lambda item: item[1].get('posted_date') or "", reverse=True)
+
+            for idx, job in ordered_jobs:
+                fit_label = f" · 🎯 {fit_scores[idx]}% fit" if idx in fit_scores else ""
+                if idx in semantic_scores:
+                    fit_label += f" · 🧠 {semantic_scores[idx]}% match"
                 with st.expander(
-                    f"**{job.get('title', 'Unknown Title')}** — {job.get('agency', 'Unknown Agency')}",
+                    f"**{job.get('title', 'Unknown Title')}** — {job.get('agency', 'Unknown Agency')}{fit_label}",
                     expanded=False
                 ):
                     # Job Details
@@ -878,11 +1057,50 @@ def main():
                     with col_info2:
                         st.markdown(f"**📅 Posted:** {job.get('posted_date', 'N/A')}")
                         st.markdown(f"**⏰ Closes:** {job.get('closing_date', 'N/A')}")
+
+                    # Batch analysis summary, if available
+                    batch_analysis = st.session_state.batch_analyses.get(job.get('id'))
+                    if batch_analysis and "error" not in batch_analysis and "critical_error" not in batch_analysis:
+                        batch_keywords = batch_analysis.get("keywords_for_ats", [])
+                        if batch_keywords:
+                            st.markdown(" ".join(f'<span class="keyword-pill">{k}</span>' for k in batch_keywords[:12]), unsafe_allow_html=True)
+                        for req in batch_analysis.get("must_have_requirements", [])[:3]:
+                            st.markdown(f'<div class="bullet-item">{req}</div>', unsafe_allow_html=True)
+                    elif batch_analysis:
+                        st.caption(f"⚠️ {batch_analysis.get('error') or batch_analysis.get('critical_error')}")
+
+                    # Batch-generated package, if available
+                    batch_package = st.session_state.batch_packages.get(job.get('id'))
+                    if batch_package:
+                        saved = batch_package.get("files") or {}
+                        ats = batch_package["ats_analysis"].get("ats_percentage", 0)
+                        st.caption(f"📦 Package ready · ATS {ats}% · " + (", ".join(
+                            os.path.basename(path) for path in saved.values()) or "not saved"))
                     
+                    # Similar postings from the local index
+                    if st.button("🔗 Find Similar Jobs", key=f"similar_{idx}", use_container_width=True):
+                        similar = get_job_index().similar_to(job, k=5)
+                        if similar:
+                            for match in similar:
+                                st.markdown(
+                                    f"- [{match.get('title', 'Unknown Title')}]({match.get('url', '#')}) — "
+                                    f"{match.get('agency', 'Unknown Agency')} · {round(match['similarity'] * 100)}% similar"
+                                )
+                        else:
+                            st.caption("No similar postings indexed yet — run a few more searches.")
+
                     # Action Button
                     if st.button("🎯 Analyze This Position", key=f"select_{idx}", use_container_width=True):
                         st.session_state.selected_job = job
-                        st.session_state.job_analysis = None
+                        cached_analysis = st.session_state.batch_analyses.get(job.get('id'))
+                        if cached_analysis and "error" not in cached_analysis and "critical_error" not in cached_analysis:
+                            st.session_state.job_analysis = cached_analysis
+                        else:
+                            st.session_state.job_analysis = lookup_precomputed_analysis(job)
+                        # Frequently opened postings are pre-analyzed by the background worker
+                        if job.get('id'):
+                            get_job_store().upsert_jobs([job])
+                            get_analysis_queue().record_view(job['id'])
                         st.rerun()
 
     # ════════════════════════════════════════════════════════════════
@@ -911,16 +1129,23 @@ def main():
         # Process Upload
         if uploaded:
             try:
-                with pdfplumber.open(uploaded) as pdf:
-                    text = "\n".join(p.extract_text() or "" for p in pdf.pages if p.extract_text())
-                st.session_state.resume_text = text.strip()
+                # Extraction is cached by file hash, so reruns don't re-parse the PDF
+                data = uploaded.getvalue()
+                resume_hash = content_hash(data)
+                if st.session_state.resume_hash != resume_hash:
+                    parsed = ingest_resume_pdf(data)
+                    st.session_state.resume_text = parsed["text"].strip()
+                    st.session_state.resume_hash = resume_hash
                 st.success("✅ Resume uploaded and processed successfully!")
             except Exception as e:
                 st.error(f"❌ Error reading PDF: {e}")
 
-        # Process Pasted Text
+        # Process Pasted Text (only when it changes, so edits made below survive reruns)
         elif pasted.strip():
-            st.session_state.resume_text = pasted.strip()
+            pasted_hash = content_hash(pasted.strip().encode("utf-8"))
+            if st.session_state.resume_hash != pasted_hash:
+                st.session_state.resume_text = pasted.strip()
+                st.session_state.resume_hash = pasted_hash
 
         # Display Current Resume
         if st.session_state.resume_text:
@@ -931,17 +1156,22 @@ def main():
                     st.session_state.resume_text,
                     height=380,
                     key="resume_editor",
-                    help="You can edit your resume text here before analysis"
+                    help="You can edit your resume text here before analysis",
+                    on_change=sync_resume_editor
                 )
             
             # Stats
-            word_count = len(st.session_state.resume_text.split())
+            parsed_resume = parse_resume(st.session_state.resume_text)
+            word_count = parsed_resume.word_count
             char_count = len(st.session_state.resume_text)
             col_stat1, col_stat2 = st.columns(2)
             with col_stat1:
                 st.metric("📊 Word Count", f"{word_count:,}")
             with col_stat2:
                 st.metric("📊 Character Count", f"{char_count:,}")
+            detected = [s.heading or s.name.title() for s in parsed_resume.sections if s.name != "header"]
+            if detected:
+                st.caption(f"🧩 Sections detected: {', '.join(detected)} · {len(parsed_resume.skills)} skills listed")
 
     # ════════════════════════════════════════════════════════════════
     # TAB 3: Analysis & Generation
@@ -968,6 +1198,10 @@ def main():
             
             st.markdown("---")
 
+            # The background worker may have finished this posting since it was selected
+            if not st.session_state.job_analysis:
+                st.session_state.job_analysis = lookup_precomputed_analysis(job)
+
             # Analyze Button
             if not st.session_state.job_analysis:
                 if st.button("🚀 Analyze Job Requirements", type="primary", use_container_width=True):
@@ -976,13 +1210,22 @@ def main():
                     else:
                         with st.spinner("🤖 Analyzing position with AI..."):
                             try:
-                                analyst = JobDescriptionAnalyst()
-                                full_text = f"{job.get('description', '')}\n\nQualifications:\n{job.get('requirements', '')}"
-                                analysis = analyst.analyze_job_description(
-                                    full_text,
-                                    job.get('title', 'Unknown Position'),
-                                    job.get('agency', 'Unknown Agency')
-                                )
+                                full_text = JobDescriptionAnalyst.job_text(job)
+                                live = st.empty()
+                                analysis = None
+                                with acquire_analyst() as analyst:
+                                    for event in analyst.stream_analysis(
+                                        full_text,
+                                        job.get('title', 'Unknown Position'),
+                                        job.get('agency', 'Unknown Agency')
+                                    ):
+                                        if event["done"]:
+                                            analysis = event["result"]
+                                        else:
+                                            ready = [k.replace('_', ' ') for k in event["fields"] if k not in ("job_title", "agency")]
+                                            if ready:
+                                                live.caption(f"🧩 Extracted so far: {', '.join(ready)}")
+                                live.empty()
                                 st.session_state.job_analysis = analysis
                                 st.success("✅ Analysis complete!")
                                 st.rerun()
@@ -1092,16 +1335,23 @@ def main():
                                 else:
                                     with st.spinner("✨ Generating tailored documents with AI..."):
                                         try:
-                                            agent = ResumeCoverLetterAgent()
-                                            resume_res = agent.customize_resume(st.session_state.resume_text, analysis)
-                                            cover_res = agent.generate_cover_letter(st.session_state.resume_text, analysis)
-                                            resume_analys = agent.analyze_resume_ats_compatibility(
-                                                st.session_state.resume_text,
-                                                keywords
-                                            )
-                                            st.session_state.resume_analys = resume_analys
-                                            st.session_state.tailored_resume = resume_res
-                                            st.session_state.cover_letter = cover_res
+                                            # Cover letter streams in live while the resume is tailored in the background
+                                            live_letter = st.empty()
+                                            package = None
+                                            with acquire_writer() as agent:
+                                                for event in agent.stream_application_package(
+                                                    parse_resume(st.session_state.resume_text),
+                                                    analysis,
+                                                    keywords
+                                                ):
+                                                    if event["done"]:
+                                                        package = event["result"]
+                                                    elif event["fields"].get("cover_letter"):
+                                                        live_letter.markdown(event["fields"]["cover_letter"].replace("\n", "  \n"))
+                                            live_letter.empty()
+                                            st.session_state.resume_analys = package["ats_analysis"]
+                                            st.session_state.tailored_resume = package["tailored_resume"]
+                                            st.session_state.cover_letter = package["cover_letter"]
                                             st.success("✅ Documents generated successfully!")
                                             st.rerun()
                                         except Exception as e:
@@ -1167,8 +1417,25 @@ def main():
                             st.markdown("---")
                             st.markdown("### ✨ Tailored Resume")
                             
+                            regenerated = st.session_state.tailored_resume.get("sections_regenerated")
+                            reused = st.session_state.tailored_resume.get("sections_reused")
+                            if regenerated is not None:
+                                st.caption(f"♻️ {len(regenerated)} section(s) regenerated, {len(reused or [])} reused from earlier runs")
+
                             with st.expander("📄 **View Tailored Resume**", expanded=False):
                                 st.markdown(st.session_state.tailored_resume["customized_resume"].replace("\n", "  \n"))
+
+                            # After editing the resume, only the changed sections go back to the LLM
+                            if st.button("♻️ Update Tailored Resume", use_container_width=True, key="update_tailored_resume"):
+                                with st.spinner("♻️ Re-tailoring changed sections..."):
+                                    try:
+                                        parsed_resume = parse_resume(st.session_state.resume_text)
+                                        with acquire_writer() as agent:
+                                            st.session_state.tailored_resume = agent.tailor_resume_sections(parsed_resume, analysis)
+                                            st.session_state.resume_analys = agent.analyze_resume_ats_compatibility(parsed_resume, keywords)
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"❌ Update failed: {str(e)}")
                             
                             st.download_button(
                                 "📥 Download Tailored Resume",
@@ -1232,6 +1499,21 @@ def main():
             st.metric("Selected", "✓" if st.session_state.selected_job else "—")
         
         st.metric("Resume Status", "Uploaded ✓" if st.session_state.resume_text else "Not Uploaded")
+
+        # Shared Gemini scheduler (all sessions here, plus the background worker processes)
+        llm_stats = get_llm_scheduler().stats()
+        col_s3, col_s4 = st.columns(2)
+        with col_s3:
+            st.metric("LLM Queue", llm_stats["queued_total"])
+        with col_s4:
+            st.metric("LLM Rate", f"{llm_stats['rate_factor']:.0%}")
+        if llm_stats["paused_for"]:
+            st.caption(f"⏳ Rate limited — resuming in {llm_stats['paused_for']}s")
+        elif llm_stats["queued_total"] or llm_stats["waiting_elsewhere"]:
+            lanes = [f"{lane}: {n}" for lane, n in llm_stats["queued"].items() if n]
+            if llm_stats["waiting_elsewhere"]:
+                lanes.append(f"other processes: {llm_stats['waiting_elsewhere']}")
+            st.caption(" · ".join(lanes))
         
         st.markdown("---")
         
@@ -0,0 +1,19 @@
+from utils.ats_matcher import KeywordMatcher, build_index, normalize_keywords, score_resume_against_jobs, stem
+
+
+def test_stem_strips_stacked_suffixes():
+    assert stem("engineering") == stem("engineer") == stem("engineers")
+    assert stem("programming") == stem("program") == stem("programmer")
+    assert stem("management") == stem("managed") == stem("managing")
+
+
+def test_engineering_keyword_matches_engineer_resume():
+    index = build_index("Senior Software Engineer with 8 years of Python experience")
+    assert KeywordMatcher(["Software Engineering"]).match(index) == [("Software Engineering", 2)]
+
+
+def test_batch_score_agrees_with_keyword_count_after_normalization():
+    keywords = ["Python", "python", "--", "Software Engineering", "software engineer"]
+    assert normalize_keywords(keywords) == ["Python", "Software Engineering"]
+    [result] = score_resume_against_jobs("Software Engineer, Python", [keywords])
+    assert result == {"ats_score": 4, "ats_percentage": 100.0, "keyword_count": 2}
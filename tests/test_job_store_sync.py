@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from harvester import harvest_query
+from utils.job_store import JobStore
+
+
+class FakeAPI:
+    """Stands in for USAJobsAPI: postings newest first, honouring max_results and DatePosted"""
+
+    def __init__(self, count: int = 10):
+        now = datetime.now()
+        self.postings = [self.posting(str(i), now - timedelta(hours=i)) for i in range(count)]
+        self.calls = []
+        self.last_search_meta = {}
+
+    @staticmethod
+    def posting(job_id: str, posted: datetime) -> dict:
+        return {
+            "id": job_id,
+            "title": f"Software Engineer {job_id}",
+            "agency": "Agency",
+            "location": "Denver, CO",
+            "posted_date": posted.strftime("%Y-%m-%dT%H:%M:%S"),
+            "closing_date": (posted + timedelta(days=30)).strftime("%Y-%m-%d"),
+        }
+
+    def iter_jobs(self, keyword, location, max_results=100, page_size=25, max_workers=4, extra_params=None):
+        self.calls.append({"max_results": max_results, **(extra_params or {})})
+        jobs = sorted(self.postings, key=lambda job: job["posted_date"], reverse=True)
+        if extra_params and "DatePosted" in extra_params:
+            cutoff = (datetime.now() - timedelta(days=extra_params["DatePosted"])).strftime("%Y-%m-%dT%H:%M:%S")
+            jobs = [job for job in jobs if job["posted_date"] >= cutoff]
+        self.last_search_meta = {"total": len(jobs), "pages": 1}
+        yield from jobs[:max_results]
+
+
+def stored_ids(store: JobStore) -> set:
+    with store._connect() as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM postings")}
+
+
+def test_interactive_search_does_not_stop_the_harvester_backfilling(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    api = FakeAPI()
+
+    store.search_with_refresh(api, "Software Engineer", "Denver, CO", max_results=3)
+    harvest_query(api, store, "Software Engineer", "Denver, CO")
+
+    assert stored_ids(store) == {str(i) for i in range(10)}
+    assert "DatePosted" not in api.calls[-1]
+
+
+def test_harvested_query_is_served_locally_and_picks_up_new_postings(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    api = FakeAPI(count=5)
+
+    harvest_query(api, store, "Software Engineer", "Denver, CO")
+    calls = len(api.calls)
+    jobs = store.search_with_refresh(api, "Software Engineer", "Denver, CO", max_results=25)
+    assert len(api.calls) == calls
+    assert {job["id"] for job in jobs} == {str(i) for i in range(5)}
+
+    api.postings.append(FakeAPI.posting("99", datetime.now()))
+    harvest_query(api, store, "Software Engineer", "Denver, CO")
+    jobs = store.search_with_refresh(api, "Software Engineer", "Denver, CO", max_results=25)
+    assert "99" in {job["id"] for job in jobs}
@@ -0,0 +1,29 @@
+from utils.json_repair import loads_tolerant
+
+
+def test_plain_and_fenced_objects_are_not_reported_as_repaired():
+    assert loads_tolerant('{"a": 1}') == ({"a": 1}, False)
+    assert loads_tolerant('```json\n{"a": 1, "b": [2, 3]}\n```') == ({"a": 1, "b": [2, 3]}, False)
+    assert loads_tolerant('Here you go: {"a": "x"} Hope this helps!') == ({"a": "x"}, False)
+
+
+def test_trailing_commas_and_raw_newlines_are_repaired():
+    assert loads_tolerant('```json\n{"a": [1, 2,], "b": "line\nbreak",}\n```') == (
+        {"a": [1, 2], "b": "line\nbreak"}, True)
+
+
+def test_invalid_value_keeps_the_complete_elements_before_it():
+    assert loads_tolerant('{"a": 1, "b": unquoted}') == ({"a": 1}, True)
+    assert loads_tolerant('{"a": "x", "b": true, "c": nope}') == ({"a": "x", "b": True}, True)
+
+
+def test_truncated_output_drops_only_the_half_written_element():
+    assert loads_tolerant('{"a": 1, "b": tru') == ({"a": 1}, True)
+    assert loads_tolerant('{"a": 1, "b": "half') == ({"a": 1, "b": "half"}, True)
+    assert loads_tolerant('{"a": [1, 2, {"c": 3}, {"d": ') == ({"a": [1, 2, {"c": 3}, {}]}, True)
+    assert loads_tolerant('{"a": 1, "b') == ({"a": 1}, True)
+
+
+def test_nothing_usable():
+    assert loads_tolerant("") == (None, False)
+    assert loads_tolerant("no json here") == (None, False)
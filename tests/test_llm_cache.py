@@ -0,0 +1,23 @@
+import time
+
+from utils.llm_cache import LLMResultCache
+
+
+def test_ttl_and_maxsize_only_prune_their_own_namespace(tmp_path):
+    db_path = tmp_path / "llm_cache.sqlite3"
+    bounded = LLMResultCache("bounded", db_path, ttl=3600, maxsize=2)
+    other = LLMResultCache("other", db_path)
+    other.set("kept", {"value": "other"}, "v1")
+
+    for i in range(4):
+        bounded.set(str(i), {"value": i}, "v1")
+        time.sleep(0.01)
+
+    assert bounded.get("0") is None
+    assert bounded.get("3") == {"value": 3}
+    assert bounded.stats()["entries"] == 2
+
+    bounded.ttl = 0
+    assert bounded.get("3") is None
+    assert bounded.prune() == 2
+    assert other.get("kept") == {"value": "other"}
@@ -0,0 +1,30 @@
+from usajobs_api import USAJobsAPI
+
+
+def test_search_many_merges_in_query_order_and_dedupes_by_position_id():
+    api = USAJobsAPI(use_cache=False)
+    api.api_key = "test"
+    results = {
+        ("Nurse", "Denver, CO"): [{"id": "1"}, {"id": "2"}],
+        ("Nurse", "Boulder, CO"): [{"id": "2"}, {"id": "3"}],
+        ("Medic", None): [{"id": "4"}, {"id": "1"}],
+    }
+    api.search_jobs = lambda keyword, location, results_per_page: results[(keyword, location)]
+
+    jobs = api.search_many(list(results), max_concurrency=2)
+
+    assert [job["id"] for job in jobs] == ["1", "2", "3", "4"]
+
+
+def test_search_many_skips_failed_queries():
+    api = USAJobsAPI(use_cache=False)
+    api.api_key = "test"
+
+    def search_jobs(keyword, location, results_per_page):
+        if keyword == "broken":
+            raise RuntimeError("boom")
+        return [{"id": keyword}]
+
+    api.search_jobs = search_jobs
+
+    assert [job["id"] for job in api.search_many([("broken", None), ("ok", None)])] == ["ok"]
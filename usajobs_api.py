@@ -1,22 +1,224 @@
 import requests
 import json
 import re
-from utils.config import USAJOBS_API_KEY   # assuming this is correct
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.config import (
+    USAJOBS_API_KEY,   # assuming this is correct
+    USAJOBS_CONNECT_TIMEOUT,
+    USAJOBS_READ_TIMEOUT,
+    USAJOBS_MAX_RETRIES,
+    USAJOBS_BACKOFF_FACTOR,
+    USAJOBS_POOL_SIZE,
+    USAJOBS_CACHE_TTL,
+    USAJOBS_CACHE_MAXSIZE,
+    USAJOBS_CACHE_ON_DISK,
+    CACHE_DIR,
+)
+from utils.cache import TTLCache, make_cache_key, normalize_text
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RESULTS_PER_PAGE = 500   # USAJOBS hard limit for ResultsPerPage
+
 
 class USAJobsAPI:
-    def __init__(self):
+    # One keep-alive connection pool per process, shared by every instance
+    _session = None
+    _session_lock = threading.Lock()
+    # Shared response cache so repeat searches skip the network across reruns and users
+    _cache = TTLCache(
+        maxsize=USAJOBS_CACHE_MAXSIZE,
+        ttl=USAJOBS_CACHE_TTL,
+        disk_dir=CACHE_DIR / "usajobs" if USAJOBS_CACHE_ON_DISK else None,
+    )
+
+    # Callables notified with every freshly parsed page of jobs (e.g. local indexes)
+    _job_listeners = []
+
+    @classmethod
+    def add_job_listener(cls, listener) -> None:
+        if listener not in cls._job_listeners:
+            cls._job_listeners.append(listener)
+
+    def _notify_listeners(self, jobs: list) -> None:
+        for listener in list(self._job_listeners):
+            try:
+                listener(jobs)
+            except Exception as e:
+                print(f"Job listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def __init__(self, connect_timeout: float = USAJOBS_CONNECT_TIMEOUT, read_timeout: float = USAJOBS_READ_TIMEOUT,
+                 use_cache: bool = True):
         self.api_key = USAJOBS_API_KEY
         self.base_url = "https://data.usajobs.gov/api"
         self.headers = {
             "User-Agent": "job_hunt_assistant/1.0",
             "Authorization-Key": self.api_key          # ← FIXED: this is the correct header name
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.last_search_meta = {}
+        self.cache = self._cache if use_cache else None
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        """Return the shared pooled session, creating it on first use"""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = cls._build_session()
+        return cls._session
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        retry_kwargs = dict(
+            total=USAJOBS_MAX_RETRIES,
+            connect=USAJOBS_MAX_RETRIES,
+            read=USAJOBS_MAX_RETRIES,
+            status=USAJOBS_MAX_RETRIES,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            backoff_factor=USAJOBS_BACKOFF_FACTOR,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(backoff_jitter=USAJOBS_BACKOFF_FACTOR, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 2.0 has no jitter support
+            retry = Retry(**retry_kwargs)
+
+        adapter = HTTPAdapter(
+            pool_connections=USAJOBS_POOL_SIZE,
+            pool_maxsize=USAJOBS_POOL_SIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _get(self, path: str, params: dict | None = None) -> requests.Response:
+        return self._get_session().get(
+            f"{self.base_url}{path}",
+            headers=self.headers,
+            params=params,
+            timeout=self.timeout,
+        )
 
     def search_jobs(self, keyword: str, location: str, results_per_page: int = 10) -> list:
         if not self.api_key:
             print("Error: USAJOBS_API_KEY not configured")
             return []
 
+        params = self._search_params(keyword, location, results_per_page)
+        page = self._fetch_page(params)
+        if page is None:
+            return []
+        parsed_jobs, _ = page
+        print(f"✓ Found {len(parsed_jobs)} jobs for keyword: '{keyword}' in '{location}'")
+        return parsed_jobs
+
+    def search_many(self, queries: list[tuple[str, str | None]], results_per_page: int = 10,
+                    max_concurrency: int = USAJOBS_POOL_SIZE) -> list:
+        """
+        Run every (keyword, location) search concurrently and return the merged jobs, deduped by PositionID.
+
+        At most ``max_concurrency`` searches are in flight at once, all on the
+        shared pooled session (and response cache). Results keep query order,
+        so a posting matched by several queries is listed under the first.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        if not self.api_key:
+            print("Error: USAJOBS_API_KEY not configured")
+            return []
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(queries)))) as executor:
+            futures = [executor.submit(self.search_jobs, keyword, location, results_per_page)
+                       for keyword, location in queries]
+            merged = []
+            seen_ids = set()
+            for (keyword, location), future in zip(queries, futures):
+                try:
+                    jobs = future.result()
+                except Exception as e:
+                    print(f"Error searching jobs for '{keyword}' in '{location}': {e}")
+                    continue
+                for job in jobs:
+                    job_id = job.get("id")
+                    if job_id and job_id in seen_ids:
+                        continue
+                    seen_ids.add(job_id)
+                    merged.append(job)
+
+        print(f"✓ Found {len(merged)} unique jobs across {len(queries)} searches")
+        return merged
+
+    def iter_jobs(self, keyword: str, location: str, max_results: int = 100,
+                  page_size: int = 25, max_workers: int = 4, extra_params: dict | None = None):
+        """
+        Lazily page through USAJOBS search results, yielding parsed jobs as they arrive.
+
+        The first page is fetched up front to learn the total result count; the
+        remaining pages are then requested concurrently but yielded in page order,
+        so the API's DatePosted-descending sort is preserved. Paging metadata is kept on ``self.last_search_meta``. ``extra_params``
+        are passed through to the Search endpoint (e.g. ``{"DatePosted": 3}``).
+        """
+        self.last_search_meta = {}
+        if not self.api_key:
+            print("Error: USAJOBS_API_KEY not configured")
+            return
+        if max_results <= 0:
+            return
+
+        page_size = max(1, min(page_size, max_results, MAX_RESULTS_PER_PAGE))
+        first = self._fetch_page(self._search_params(keyword, location, page_size, page=1, extra_params=extra_params))
+        if first is None:
+            return
+        jobs, meta = first
+        self.last_search_meta = meta
+
+        yielded = 0
+        for job in jobs[:max_results]:
+            yield job
+            yielded += 1
+
+        total = min(max_results, meta.get("total", 0))
+        num_pages = min(meta.get("pages", 1), math.ceil(total / page_size))
+        if yielded >= total or num_pages <= 1:
+            print(f"✓ Found {yielded} jobs for keyword: '{keyword}' in '{location}'")
+            return
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [
+                executor.submit(self._fetch_page,
+                                self._search_params(keyword, location, page_size, page=n, extra_params=extra_params))
+                for n in range(2, num_pages + 1)
+            ]
+            # Later pages keep downloading while earlier ones are consumed
+            for future in futures:
+                page = future.result()
+                if page is None:
+                    continue
+                for job in page[0]:
+                    if yielded >= max_results:
+                        break
+                    yield job
+                    yielded += 1
+                if yielded >= max_results:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        print(f"✓ Found {yielded} jobs for keyword: '{keyword}' in '{location}'")
+
+    def _search_params(self, keyword: str, location: str, results_per_page: int, page: int = 1,
+                       extra_params: dict | None = None) -> dict:
         params = {
             "Keyword": keyword,
             "LocationName": location,
@@ -24,25 +226,58 @@ class USAJobsAPI:
             "SortField": "DatePosted",
             "SortDirection": "Desc",
         }
+        if page > 1:
+            params["Page"] = page
+        if extra_params:
+            params.update(extra_params)
+        return params
+
+    def _fetch_page(self, params: dict) -> tuple[list, dict] | None:
+        """Fetch a single search page; returns (parsed_jobs, paging_meta) or None on failure"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._search_cache_key(params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                parsed_jobs, meta = cached
+                return parsed_jobs, meta
 
         try:
-            response = requests.get(f"{self.base_url}/Search", headers=self.headers, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                jobs = data.get("SearchResult", {}).get("SearchResultItems", [])
-                parsed_jobs = []
-                for job_item in jobs:
-                    job_data = self._parse_job_data(job_item)
-                    if job_data:
-                        parsed_jobs.append(job_data)
-                print(f"✓ Found {len(parsed_jobs)} jobs for keyword: '{keyword}' in '{location}'")
-                return parsed_jobs
-            else:
+            response = self._get("/Search", params)
+            if response.status_code != 200:
                 print(f"API Request failed with error code {response.status_code} - {response.text[:200]}")
-                return []
+                return None
+
+            result = response.json().get("SearchResult", {})
+            parsed_jobs = []
+            for job_item in result.get("SearchResultItems", []):
+                job_data = self._parse_job_data(job_item)
+                if job_data:
+                    parsed_jobs.append(job_data)
+
+            meta = {
+                "count": int(result.get("SearchResultCount", len(parsed_jobs)) or 0),
+                "total": int(result.get("SearchResultCountAll", len(parsed_jobs)) or 0),
+                "pages": int(result.get("UserArea", {}).get("NumberOfPages", 1) or 1),
+                "page": int(params.get("Page", 1)),
+            }
+            if cache_key is not None:
+                self.cache.set(cache_key, [parsed_jobs, meta])
+            if parsed_jobs:
+                self._notify_listeners(parsed_jobs)
+            return parsed_jobs, meta
         except Exception as e:
             print(f"Error searching jobs: {e}")
-            return []
+            return None
+
+    @staticmethod
+    def _search_cache_key(params: dict) -> str:
+        normalized = {
+            key: normalize_text(value) if isinstance(value, str) or value is None else value
+            for key, value in params.items()
+        }
+        normalized.setdefault("Page", 1)
+        return make_cache_key("search", normalized)
 
     def _parse_job_data(self, job_item: dict) -> dict | None:
         try:
@@ -82,14 +317,24 @@ class USAJobsAPI:
         return cleaned[:2000]
 
     def get_job_details(self, job_id: str) -> dict:
+        cache_key = make_cache_key("position", str(job_id).strip())
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             # Note: some use /codelist/positions/ or /Search/Position/ – test which works with your key
-            response = requests.get(f"{self.base_url}/positions/{job_id}", headers=self.headers)
+            response = self._get(f"/positions/{job_id}")
             if response.status_code == 200:
-                return response.json()
+                details = response.json()
+                if self.cache is not None:
+                    self.cache.set(cache_key, details)
+                return details
             else:
                 print(f"Error fetching job details: {response.status_code} - {response.text[:200]}")
                 return {}
         except Exception as e:
             print(f"Error getting job details: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
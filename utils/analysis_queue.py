@@ -0,0 +1,155 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from utils.config import ANALYSIS_QUEUE_PATH
+
+# Base priorities; viewed postings also gain one point per view
+PRIORITY_HARVESTED = 0
+PRIORITY_VIEWED = 10
+
+# A claimed item not finished within this many seconds is handed out again
+CLAIM_LEASE = 600
+
+MAX_ATTEMPTS = 3
+# A failed item waits RETRY_BACKOFF * 2**(attempts - 1) seconds before it can be claimed again,
+# so a burst of 429s or a short outage doesn't use up every attempt in one pass
+RETRY_BACKOFF = 300
+
+
+class AnalysisQueue:
+    """
+    Durable SQLite work queue of postings waiting for a background job analysis.
+
+    Items are PositionIDs (the posting itself lives in the JobStore) with a
+    status of pending / running / done / failed. Workers ``claim`` the
+    highest-priority pending items, so postings the user keeps opening jump
+    ahead of bulk harvests; claims expire after ``CLAIM_LEASE`` seconds so a
+    crashed worker never strands work.
+    """
+
+    def __init__(self, db_path: str | Path = ANALYSIS_QUEUE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS analysis_queue (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    view_count INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    claimed_at REAL,
+                    finished_at REAL,
+                    last_error TEXT,
+                    not_before REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_queue_pending ON analysis_queue (status, priority DESC, enqueued_at);
+            """)
+            # Queues created before retry backoff existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(analysis_queue)")}
+            if "not_before" not in columns:
+                conn.execute("ALTER TABLE analysis_queue ADD COLUMN not_before REAL")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, job_ids: list[str], priority: int = PRIORITY_HARVESTED) -> int:
+        """Queue (or re-queue) postings whose content is new or has changed"""
+        now = time.time()
+        rows = [(str(job_id), priority, now) for job_id in job_ids if job_id]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO analysis_queue (job_id, priority, enqueued_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = 'pending', attempts = 0, last_error = NULL, not_before = NULL, "
+                "priority = MAX(priority, excluded.priority), "
+                "enqueued_at = CASE WHEN status = 'pending' THEN enqueued_at ELSE excluded.enqueued_at END",
+                rows,
+            )
+        return len(rows)
+
+    def record_view(self, job_id: str) -> None:
+        """Count a view; unseen or still-pending postings move up the queue, finished ones stay done"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO analysis_queue (job_id, priority, view_count, enqueued_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET view_count = view_count + 1, "
+                "priority = MAX(priority, ? + view_count + 1)",
+                (str(job_id), PRIORITY_VIEWED + 1, time.time(), PRIORITY_VIEWED),
+            )
+
+    def claim(self, limit: int = 20) -> list[str]:
+        """Mark up to ``limit`` of the most urgent items as running and return their ids"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE analysis_queue SET status = 'pending' WHERE status = 'running' AND claimed_at < ?",
+                (now - CLAIM_LEASE,),
+            )
+            ids = [row[0] for row in conn.execute(
+                "SELECT job_id FROM analysis_queue WHERE status = 'pending' "
+                "AND (not_before IS NULL OR not_before <= ?) "
+                "ORDER BY priority DESC, enqueued_at LIMIT ?",
+                (now, limit),
+            )]
+            conn.executemany(
+                "UPDATE analysis_queue SET status = 'running', claimed_at = ? WHERE job_id = ?",
+                [(now, job_id) for job_id in ids],
+            )
+        return ids
+
+    def complete(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE analysis_queue SET status = 'done', finished_at = ?, last_error = NULL WHERE job_id = ?",
+                (time.time(), str(job_id)),
+            )
+
+    def release(self, job_id: str) -> None:
+        """Hand a claimed item back untouched (e.g. the token budget ran out before it was tried)"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE analysis_queue SET status = 'pending', claimed_at = NULL WHERE job_id = ?",
+                (str(job_id),),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """
+        Record a failed attempt; the item is retried, after an exponential
+        backoff, until it has failed ``MAX_ATTEMPTS`` times
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE analysis_queue SET attempts = attempts + 1, last_error = ?, claimed_at = NULL, "
+                "finished_at = ?, not_before = ? + ? * (1 << attempts), "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE job_id = ?",
+                (str(error)[:500], now, now, RETRY_BACKOFF, MAX_ATTEMPTS, str(job_id)),
+            )
+
+    def discard(self, job_ids: list[str]) -> None:
+        """Drop items whose posting no longer exists (e.g. expired from the job store)"""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM analysis_queue WHERE job_id = ?", [(str(i),) for i in job_ids])
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM analysis_queue GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("pending", "running", "done", "failed")}
+
+
+@lru_cache(maxsize=1)
+def get_analysis_queue() -> AnalysisQueue:
+    return AnalysisQueue()
@@ -0,0 +1,266 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:   # optional: dense NumPy is fine for typical result sets
+    sparse = None
+
+# Keeps tech tokens intact: c++, c#, .net, node.js, ci/cd, full-stack
+TOKEN_RE = re.compile(r"\.?[a-z0-9#+]+(?:[.\-/][a-z0-9#+]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "of",
+    "on", "or", "s", "the", "to", "with", "within", "using", "via",
+}
+
+# Longest suffixes first; (suffix, replacement)
+_SUFFIXES = (
+    ("ations", ""), ("ation", ""), ("ments", ""), ("ment", ""), ("ings", ""), ("ing", ""),
+    ("ies", "y"), ("ied", "y"), ("ers", ""), ("er", ""), ("ed", ""), ("es", ""), ("s", ""),
+)
+
+# Extra filler words ignored when pulling keywords out of raw posting text
+POSTING_STOPWORDS = STOPWORDS | {
+    "you", "your", "will", "this", "that", "our", "we", "may", "must", "have", "has", "all",
+    "not", "other", "such", "who", "which", "their", "they", "it", "its", "can", "if", "than",
+    "including", "include", "position", "duty", "duties", "applicant", "applicants", "level",
+    "grade", "year", "work", "job", "qualification", "qualifications", "experience", "specialized",
+    "equivalent", "following", "perform", "performing", "ensure", "provide", "related", "one",
+}
+
+# Maximum token distance for the words of a multi-word keyword to count as a partial match
+PROXIMITY_WINDOW = 8
+
+
+@lru_cache(maxsize=50000)
+def stem(word: str) -> str:
+    """
+    Light suffix-stripping stemmer so 'managed', 'managing' and 'management' match.
+
+    Suffixes are stripped repeatedly until none apply, so stacked forms reduce
+    to the same stem as their base word ('engineering' -> 'engineer' -> 'engin',
+    same as 'engineer'); a doubled final consonant left behind is collapsed
+    ('programming' -> 'programm' -> 'program').
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    stripped = True
+    while stripped and not word.endswith(("ss", "us", "is")):
+        stripped = False
+        for suffix, replacement in _SUFFIXES:
+            if word.endswith(suffix):
+                base = word[: -len(suffix)] + replacement
+                if len(base) >= 3:
+                    if len(base) > 3 and base[-1] == base[-2] and base[-1] not in "aeioulsfz":
+                        base = base[:-1]
+                    word = base
+                    stripped = True
+                    break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class TokenIndex:
+    """
+    One-pass positional index over a document.
+
+    ``tokens`` is the stemmed token stream and ``positions`` maps every stem to
+    the sorted list of positions it occurs at. Hyphen/slash compounds such as
+    'full-stack' are indexed both whole and by their parts.
+    """
+
+    def __init__(self, text: str):
+        self.tokens = []
+        self.positions = defaultdict(list)
+        for raw in tokenize(text):
+            pos = len(self.tokens)
+            token = stem(raw)
+            self.tokens.append(token)
+            self.positions[token].append(pos)
+            if "-" in raw or "/" in raw:
+                for part in re.split(r"[-/]", raw):
+                    if part:
+                        self.positions[stem(part)].append(pos)
+        self.word_count = len(self.tokens)
+
+    def contains_phrase(self, stems: list[str]) -> bool:
+        """Exact, contiguous phrase match"""
+        if not stems:
+            return False
+        if len(stems) == 1:
+            return stems[0] in self.positions
+        for start in self.positions.get(stems[0], ()):
+            end = start + len(stems)
+            if end <= len(self.tokens) and self.tokens[start:end] == stems:
+                return True
+        return False
+
+    def within_window(self, stems: list[str], window: int = PROXIMITY_WINDOW) -> bool:
+        """True if every stem occurs somewhere inside a span of ``window`` tokens"""
+        lists = []
+        for s in set(stems):
+            occ = self.positions.get(s)
+            if not occ:
+                return False
+            lists.append(occ)
+        if len(lists) == 1:
+            return True
+        # Anchor on the rarest term and look for the others nearby
+        lists.sort(key=len)
+        for anchor in lists[0]:
+            lo, hi = anchor - window, anchor + window
+            if all(self._has_between(occ, lo, hi) for occ in lists[1:]):
+                return True
+        return False
+
+    @staticmethod
+    def _has_between(sorted_positions: list[int], lo: int, hi: int) -> bool:
+        i = bisect_left(sorted_positions, lo)
+        return i < len(sorted_positions) and sorted_positions[i] <= hi
+
+
+@lru_cache(maxsize=64)
+def build_index(text: str) -> TokenIndex:
+    """Cached TokenIndex, so the same resume is only tokenized once"""
+    return TokenIndex(text)
+
+
+def keyword_stems(keyword: str) -> str:
+    """Stemmed form a keyword is matched and deduplicated on; empty if it has no tokens"""
+    return " ".join(stem(t) for t in tokenize(keyword))
+
+
+def normalize_keywords(keywords: list[str]) -> list[str]:
+    """
+    Keywords that count towards an ATS score: ones without any tokens are
+    dropped and variants with the same stems keep only their first spelling.
+    Every ATS scorer goes through this so they agree on the keyword count.
+    """
+    normalized = []
+    seen = set()
+    for keyword in keywords or []:
+        norm = keyword_stems(keyword)
+        if norm and norm not in seen:
+            seen.add(norm)
+            normalized.append(keyword)
+    return normalized
+
+
+class KeywordMatcher:
+    """
+    Pre-compiled keyword list that can be scored against any number of indexed documents.
+
+    Each keyword scores 2 for an exact (word-boundary, stemmed) phrase match,
+    1 when all of its significant words appear within PROXIMITY_WINDOW tokens
+    of each other (a "partial match"), and 0 otherwise. Cost per document is
+    linear in the number of keyword occurrences, not keywords × document length.
+    """
+
+    def __init__(self, keywords: list[str]):
+        self.keywords = []
+        for keyword in keywords:
+            tokens = tokenize(keyword)
+            stems = [stem(t) for t in tokens]
+            parts = [stem(p) for t in tokens for p in re.split(r"[-/]", t) if p]
+            significant = [s for s in parts if s not in STOPWORDS] or stems
+            self.keywords.append((keyword, stems, significant))
+
+    def match(self, index: TokenIndex) -> list[tuple[str, int]]:
+        """Return (keyword, score) pairs in keyword order"""
+        results = []
+        for keyword, stems, significant in self.keywords:
+            if index.contains_phrase(stems):
+                results.append((keyword, 2))
+            elif len(significant) > 1 and index.within_window(significant):
+                results.append((keyword, 1))
+            else:
+                results.append((keyword, 0))
+        return results
+
+
+def extract_job_keywords(text: str, limit: int = 25) -> list[str]:
+    """
+    Cheap keyword list for a posting that has not been through the LLM analyst.
+
+    Ranks non-filler words and two-word phrases by frequency; phrases get a
+    small boost because they are more specific than single words.
+    """
+    words = [t for t in tokenize(text) if not t.isdigit() and len(t) > 2]
+    counts = Counter()
+    surface = {}
+    previous = None
+    for word in words:
+        if word in POSTING_STOPWORDS:
+            previous = None
+            continue
+        key = stem(word)
+        counts[key] += 1
+        surface.setdefault(key, word)
+        if previous is not None:
+            bigram = f"{previous[0]} {key}"
+            counts[bigram] += 1.5
+            surface.setdefault(bigram, f"{previous[1]} {word}")
+        previous = (key, word)
+
+    ranked = [k for k, c in counts.most_common() if c >= 2]
+    return [surface[k] for k in ranked[:limit]]
+
+
+def score_resume_against_jobs(resume_text: str | TokenIndex, job_keywords: list[list[str]]) -> list[dict]:
+    """
+    ATS-score one resume against many postings in a single vectorized pass.
+
+    Uses the same 2 / 1 / 0 per-keyword scoring as
+    ResumeCoverLetterAgent.analyze_resume_ats_compatibility. Every distinct
+    keyword across all postings is matched against the resume index once; a
+    (postings × keywords) incidence matrix then yields every posting's score
+    with one matrix-vector product. ``resume_text`` may also be a prebuilt
+    TokenIndex (e.g. ``ParsedResume.index``).
+    """
+    if not job_keywords:
+        return []
+
+    vocab = {}
+    labels = []
+    rows, cols = [], []
+    for row, keywords in enumerate(job_keywords):
+        for keyword in normalize_keywords(keywords):
+            norm = keyword_stems(keyword)
+            if norm not in vocab:
+                vocab[norm] = len(labels)
+                labels.append(keyword)
+            rows.append(row)
+            cols.append(vocab[norm])
+
+    shape = (len(job_keywords), max(1, len(labels)))
+    if sparse is not None:
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        keyword_counts = np.asarray(matrix.sum(axis=1)).ravel()
+    else:
+        matrix = np.zeros(shape, dtype=np.float32)
+        matrix[rows, cols] = 1.0
+        keyword_counts = matrix.sum(axis=1)
+
+    keyword_scores = np.zeros(shape[1], dtype=np.float32)
+    if labels:
+        index = resume_text if isinstance(resume_text, TokenIndex) else build_index(resume_text)
+        keyword_scores[:len(labels)] = [score for _, score in KeywordMatcher(labels).match(index)]
+
+    scores = np.asarray(matrix @ keyword_scores).ravel()
+    max_scores = keyword_counts * 2
+    percentages = np.divide(scores * 100, max_scores, out=np.zeros_like(scores), where=max_scores > 0)
+
+    return [
+        {"ats_score": int(score), "ats_percentage": round(float(pct), 1), "keyword_count": int(count)}
+        for score, pct, count in zip(scores, percentages, keyword_counts)
+    ]
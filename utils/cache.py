@@ -0,0 +1,143 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+_MISSING = object()
+
+
+def make_cache_key(*parts) -> str:
+    """Stable hash of JSON-serialisable key parts (dict keys are sorted)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_text(value) -> str:
+    """Lower-case and collapse whitespace so trivially different queries share a key"""
+    if value is None:
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry TTL and LRU eviction.
+
+    When ``disk_dir`` is given, entries are also written there as JSON files so
+    they survive restarts and are shared between processes. Values must be
+    JSON-serialisable for the disk backend; cached values are returned as copies.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 900, disk_dir: str | Path | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            expires_at, value = entry
+            self._store(key, value, expires_at)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, copy.deepcopy(value), expires_at)
+        self._disk_set(key, value, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _store(self, key: str, value, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    # ── Disk backend ─────────────────────────────────
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key: str, now: float):
+        if not self.disk_dir:
+            return _MISSING
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        expires_at = entry.get("expires_at", 0)
+        if expires_at <= now:
+            path.unlink(missing_ok=True)
+            return _MISSING
+        try:
+            os.utime(path)   # bump mtime so disk eviction is LRU too
+        except OSError:
+            pass
+        return expires_at, entry.get("value")
+
+    def _disk_set(self, key: str, value, expires_at: float) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Cache write failed for {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._disk_prune()
+
+    def _disk_prune(self) -> None:
+        files = list(self.disk_dir.glob("*.json"))
+        if len(files) <= self.maxsize:
+            return
+        files.sort(key=_mtime)
+        for path in files[: len(files) - self.maxsize]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+from functools import lru_cache
+
+from utils.llm_scheduler import is_rate_limit_error
+
+# Failure classes
+FAILURE_TRANSIENT = "transient"     # upstream hiccup (429, timeout, 5xx); every path would hit it, retry later
+FAILURE_PERMANENT = "permanent"     # bad key, bad model, rejected request; every path would hit it, don't retry
+FAILURE_API_SHAPE = "api_shape"     # this execution path doesn't work with the installed library versions
+
+_TRANSIENT_MARKERS = ("timeout", "timed out", "deadline", "temporarily", "unavailable", "overloaded",
+                      "connection", "reset by peer", "internal error", "try again")
+_TRANSIENT_STATUS_RE = re.compile(r"\b(?:500|502|503|504)\b")
+_PERMANENT_MARKERS = ("api key", "api_key", "unauthorized", "unauthenticated", "permission denied",
+                      "permission_denied", "forbidden", "invalid_argument", "invalid argument",
+                      "model not found", "not_found", "safety", "blocked")
+_PERMANENT_STATUS_RE = re.compile(r"\b(?:400|401|403|404)\b")
+# Errors that mean "this call pattern doesn't exist / doesn't accept these arguments"
+_API_SHAPE_TYPES = (AttributeError, TypeError, NotImplementedError, ImportError)
+
+
+def classify_failure(error: BaseException) -> str:
+    """Sort an LLM call failure into FAILURE_TRANSIENT, FAILURE_PERMANENT or FAILURE_API_SHAPE"""
+    if isinstance(error, _API_SHAPE_TYPES):
+        return FAILURE_API_SHAPE
+    if is_rate_limit_error(error) or isinstance(error, (TimeoutError, ConnectionError)):
+        return FAILURE_TRANSIENT
+    text = f"{type(error).__name__} {error}".lower()
+    if any(marker in text for marker in _PERMANENT_MARKERS) or _PERMANENT_STATUS_RE.search(text):
+        return FAILURE_PERMANENT
+    if any(marker in text for marker in _TRANSIENT_MARKERS) or _TRANSIENT_STATUS_RE.search(text):
+        return FAILURE_TRANSIENT
+    # Anything else (validation errors inside crewai, unexpected response objects, ...) is blamed on the path
+    return FAILURE_API_SHAPE
+
+
+def raised_at_call_site(error: BaseException, caller) -> bool:
+    """
+    True for a missing method or rejected signature at ``caller``'s own call
+    (``obj.missing()``, ``f(unexpected_kw=...)``): Python raises those in the
+    calling frame, whereas the same exception types coming from inside a
+    library have deeper frames.
+    """
+    if not isinstance(error, (AttributeError, TypeError)) or error.__traceback__ is None:
+        return False
+    tb = error.__traceback__
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return tb.tb_frame.f_code is getattr(caller, "__func__", caller).__code__
+
+
+class ExecutionPathBreaker:
+    """
+    Per-process circuit breaker over interchangeable ways of running a prompt.
+
+    A path whose call itself is rejected (missing method, wrong signature; see
+    raised_at_call_site) is opened for the life of the process. Other
+    path-specific failures open it for ``cooldown`` seconds after
+    ``failure_threshold`` in a row. Once the cooldown is over the path is
+    half-open: one trial call is let through and its outcome closes or
+    re-opens it. When every path is open, the one due back first is still
+    offered as a trial, so the breaker can never lock callers out for good.
+    The last path that succeeded is remembered and tried first.
+    """
+
+    def __init__(self, failure_threshold: int = 2, cooldown: float = 300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.preferred = None
+        self._failures = {}         # path -> consecutive failures
+        self._open_until = {}       # path -> monotonic time it may be retried (inf = never)
+        self._trials = set()        # half-open paths with a trial call in flight
+        self._lock = threading.Lock()
+
+    def order(self, paths: list[str]) -> list[str]:
+        """``paths`` with the remembered working path first and closed paths before open ones"""
+        with self._lock:
+            return sorted(paths, key=lambda p: (p in self._open_until, p != self.preferred))
+
+    def allow(self, path: str, paths: list[str]) -> bool:
+        """
+        Whether to try ``path`` now. Closed paths always pass; an open path
+        passes as the single half-open trial once its cooldown is over, or
+        when it is the soonest-due of ``paths`` and all of them are open.
+        """
+        now = time.monotonic()
+        with self._lock:
+            open_until = self._open_until.get(path)
+            if open_until is None:
+                return True
+            if path in self._trials:
+                return False
+            all_open = all(p in self._open_until for p in paths)
+            soonest = min(paths, key=lambda p: self._open_until.get(p, 0))
+            if open_until <= now or (all_open and path == soonest and not self._trials):
+                self._trials.add(path)
+                return True
+            return False
+
+    def record_success(self, path: str) -> None:
+        with self._lock:
+            self._trials.discard(path)
+            self._failures.pop(path, None)
+            self._open_until.pop(path, None)
+            self.preferred = path
+
+    def record_failure(self, path: str, error: BaseException, at_call_site: bool = False) -> None:
+        """
+        Count a path-specific failure; transient and permanent errors aren't
+        the path's fault and only end a trial. ``at_call_site`` marks the call
+        itself as rejected by the installed library (see raised_at_call_site).
+        """
+        with self._lock:
+            self._trials.discard(path)
+            if classify_failure(error) != FAILURE_API_SHAPE:
+                return
+            failures = self._failures.get(path, 0) + 1
+            self._failures[path] = failures
+            if at_call_site:
+                self._open_until[path] = float("inf")
+            elif failures >= self.failure_threshold:
+                self._open_until[path] = time.monotonic() + self.cooldown
+            else:
+                return
+            if self.preferred == path:
+                self.preferred = None
+        print(f"[LLM] Disabling '{path}' execution path: {type(error).__name__}: {error}")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "preferred": self.preferred,
+                "open": {p: ("process" if t == float("inf") else round(max(0.0, t - now), 1))
+                         for p, t in self._open_until.items()},
+                "failures": dict(self._failures),
+            }
+
+
+@lru_cache(maxsize=1)
+def get_execution_breaker() -> ExecutionPathBreaker:
+    return ExecutionPathBreaker()
@@ -11,9 +11,54 @@ DATA_DIR = Path(__file__).parent.parent / "data"
     
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 COVER_LETTERS_DIR = DATA_DIR / "cover_letters"
+TAILORED_RESUMES_DIR = DATA_DIR / "tailored_resumes"
 
 RESUME_PATH = DATA_DIR / "sample_resume.txt"
 APPLICATIONS_LOG_PATH = DATA_DIR / "applications_log.csv"
 
+# USAJOBS HTTP client (timeouts in seconds)
+USAJOBS_CONNECT_TIMEOUT = float(os.getenv("USAJOBS_CONNECT_TIMEOUT", "5"))
+USAJOBS_READ_TIMEOUT = float(os.getenv("USAJOBS_READ_TIMEOUT", "20"))
+USAJOBS_MAX_RETRIES = int(os.getenv("USAJOBS_MAX_RETRIES", "3"))
+USAJOBS_BACKOFF_FACTOR = float(os.getenv("USAJOBS_BACKOFF_FACTOR", "0.5"))
+USAJOBS_POOL_SIZE = int(os.getenv("USAJOBS_POOL_SIZE", "10"))
+
+# USAJOBS response cache (TTL in seconds; set USAJOBS_CACHE_ON_DISK=1 to persist under DATA_DIR)
+USAJOBS_CACHE_TTL = float(os.getenv("USAJOBS_CACHE_TTL", "900"))
+USAJOBS_CACHE_MAXSIZE = int(os.getenv("USAJOBS_CACHE_MAXSIZE", "256"))
+USAJOBS_CACHE_ON_DISK = os.getenv("USAJOBS_CACHE_ON_DISK", "0").lower() in ("1", "true", "yes")
+CACHE_DIR = DATA_DIR / "cache"
+LLM_CACHE_PATH = CACHE_DIR / "llm_cache.sqlite3"
+RESUME_CACHE_PATH = CACHE_DIR / "resumes.sqlite3"
+# Extracted resume text is personal data: keep it only briefly and for a bounded number of files
+RESUME_CACHE_TTL = float(os.getenv("RESUME_CACHE_TTL", str(7 * 86400)))
+RESUME_CACHE_MAXSIZE = int(os.getenv("RESUME_CACHE_MAXSIZE", "50"))
+# Shared LLM rate-limit state, so every process on the host draws on one Gemini quota
+LLM_SCHEDULER_PATH = CACHE_DIR / "llm_scheduler.sqlite3"
+
+# Process-wide LLM admission limits (match your Gemini quota tier)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "250000"))
+
+# Run the harvester and analysis worker loops as threads inside the web process.
+# Use this wherever processes don't share a filesystem (e.g. one Heroku dyno per process type).
+RUN_BACKGROUND_WORKERS = os.getenv("RUN_BACKGROUND_WORKERS", "0").lower() in ("1", "true", "yes")
+
+# Background harvester
+SAVED_QUERIES_PATH = DATA_DIR / "saved_queries.json"
+HARVEST_INTERVAL = int(os.getenv("HARVEST_INTERVAL", "3600"))
+HARVEST_MAX_RESULTS = int(os.getenv("HARVEST_MAX_RESULTS", "500"))
+
+# Background pre-analysis of harvested / frequently viewed postings
+ANALYSIS_QUEUE_PATH = DATA_DIR / "analysis_queue.sqlite3"
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "2"))
+PRECOMPUTE_RPM = float(os.getenv("PRECOMPUTE_RPM", "10"))
+PRECOMPUTE_TOKEN_BUDGET = int(os.getenv("PRECOMPUTE_TOKEN_BUDGET", "200000"))   # per pass
+PRECOMPUTE_INTERVAL = int(os.getenv("PRECOMPUTE_INTERVAL", "300"))
+
+# Optional sentence-transformers model for semantic job matching (TF-IDF is used if unavailable)
+SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "all-MiniLM-L6-v2")
+
 # Ensure directories exist
 COVER_LETTERS_DIR.mkdir(parents=True, exist_ok=True)
+TAILORED_RESUMES_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from utils.config import CACHE_DIR
+from utils.semantic_match import get_semantic_matcher, idf_weights
+
+JOB_INDEX_PATH = CACHE_DIR / "job_index.sqlite3"
+
+# Posting fields stored alongside each vector
+METADATA_FIELDS = ("id", "title", "agency", "location", "salary", "url", "posted_date", "closing_date")
+
+
+def posting_text(job: dict) -> str:
+    return f"{job.get('title', '')}\n{job.get('requirements', '')}\n{job.get('description', '')}"
+
+
+class JobVectorIndex:
+    """
+    Persistent nearest-neighbour index over every posting we have parsed.
+
+    Postings are stored in SQLite (text, metadata, vector); the vectors are
+    also kept in memory as one L2-normalised matrix, so a top-k query is a
+    single flat matrix-vector product — exact, and milliseconds for tens of
+    thousands of postings. New postings are appended incrementally, and
+    before every query the matrix picks up rows other processes (the
+    harvester, the analysis worker) have written since it last looked.
+
+    Backends that need IDF (the hashing fallback) have it applied at query
+    time from document frequencies kept over the whole index, so common
+    boilerplate terms don't dominate the similarity.
+
+    Closed postings are removed with ``expire_closed``; rows another process
+    removed are dropped from memory the first time a query would return them.
+    """
+
+    def __init__(self, db_path: str | Path = JOB_INDEX_PATH, matcher=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.matcher = matcher or get_semantic_matcher()
+        self._lock = threading.RLock()
+        self._ids = []
+        self._rows = {}        # job id -> row in _matrix
+        self._hashes = {}      # job id -> content hash
+        self._matrix = None
+        self._size = 0
+        self._doc_freq = None  # per dimension: how many indexed postings use it
+        self._weighted = None  # IDF-weighted, re-normalised copy of the matrix; rebuilt after changes
+        self._last_rowid = 0   # newest table row already in memory
+        self._last_added = 0.0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    added_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_added ON postings (added_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _ensure_loaded(self) -> None:
+        """
+        Bring the in-memory matrix up to date with the table: the first call
+        loads every row, later ones only rows written since. New rows get a
+        higher rowid; a replaced row may reuse the top rowid, but its added_at
+        moves on.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid, id, content_hash, backend, vector, added_at FROM postings "
+                "WHERE rowid > ? OR added_at > ? ORDER BY rowid",
+                (self._last_rowid, self._last_added),
+            ).fetchall()
+        for rowid, job_id, content_hash, backend, blob, added_at in rows:
+            self._last_rowid = max(self._last_rowid, rowid)
+            self._last_added = max(self._last_added, added_at)
+            if backend == self.matcher.backend and self._hashes.get(job_id) != content_hash:
+                vector = self._normalize(np.frombuffer(blob, dtype=np.float32))[0]
+                self._set_vector(job_id, content_hash, vector)
+
+    def _append_vector(self, vector: np.ndarray) -> int:
+        """Add a normalised row, growing the matrix geometrically to keep inserts cheap"""
+        if self._matrix is None:
+            self._matrix = np.zeros((16, vector.shape[0]), dtype=np.float32)
+        elif self._size == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+        self._matrix[self._size] = vector
+        self._size += 1
+        return self._size - 1
+
+    def _set_vector(self, job_id: str, content_hash: str, vector: np.ndarray) -> None:
+        """Insert or replace one posting's normalised vector, keeping document frequencies in step"""
+        if self._doc_freq is None:
+            self._doc_freq = np.zeros(vector.shape[0], dtype=np.int64)
+        row = self._rows.get(job_id)
+        if row is None:
+            self._rows[job_id] = self._append_vector(vector)
+            self._ids.append(job_id)
+        else:
+            self._doc_freq -= self._matrix[row] != 0
+            self._matrix[row] = vector
+        self._doc_freq += vector != 0
+        self._hashes[job_id] = content_hash
+        self._weighted = None
+
+    def _drop_vectors(self, job_ids: set) -> None:
+        """Remove postings from the in-memory matrix, compacting the remaining rows"""
+        drop = {self._rows[job_id] for job_id in job_ids if job_id in self._rows}
+        if not drop:
+            return
+        for row in drop:
+            self._doc_freq -= self._matrix[row] != 0
+        keep = [row for row in range(self._size) if row not in drop]
+        self._ids = [self._ids[row] for row in keep]
+        self._matrix = self._matrix[keep] if keep else None
+        self._size = len(keep)
+        self._rows = {job_id: row for row, job_id in enumerate(self._ids)}
+        for job_id in job_ids:
+            self._hashes.pop(job_id, None)
+        self._weighted = None
+
+    def remove_jobs(self, job_ids: list[str]) -> int:
+        """Delete postings from the index; returns how many rows were removed"""
+        job_ids = {str(job_id) for job_id in job_ids if job_id}
+        if not job_ids:
+            return 0
+        with self._lock:
+            self._ensure_loaded()
+            with self._connect() as conn:
+                removed = conn.executemany("DELETE FROM postings WHERE id = ?", [(i,) for i in job_ids]).rowcount
+            self._drop_vectors(job_ids)
+            return removed
+
+    def expire_closed(self, before: str | None = None) -> int:
+        """Remove postings whose closing date is before ``before`` (ISO date, default today)"""
+        before = before or datetime.now().strftime("%Y-%m-%d")
+        with self._connect() as conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM postings WHERE json_extract(metadata, '$.closing_date') != '' "
+                "AND json_extract(metadata, '$.closing_date') < ?",
+                (before,),
+            )]
+        return self.remove_jobs(expired)
+
+    def _idf(self) -> np.ndarray | None:
+        if not self.matcher.embedder.needs_idf or self._doc_freq is None:
+            return None
+        return idf_weights(self._doc_freq, self._size)
+
+    def _weighted_matrix(self) -> np.ndarray:
+        """Matrix to score against: IDF-weighted and re-normalised when the backend needs it"""
+        if self._weighted is None:
+            idf = self._idf()
+            matrix = self._matrix[: self._size]
+            self._weighted = self._normalize(matrix * idf) if idf is not None else matrix
+        return self._weighted
+
+    def add_jobs(self, jobs: list[dict]) -> int:
+        """Insert new postings and re-embed changed ones; returns how many were written"""
+        with self._lock:
+            self._ensure_loaded()
+            pending = {}
+            for job in jobs:
+                job_id = str(job.get("id") or "")
+                if not job_id:
+                    continue
+                text = posting_text(job)
+                content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                if self._hashes.get(job_id) != content_hash:
+                    pending[job_id] = (job, text, content_hash)
+            if not pending:
+                return 0
+
+            vectors = self._normalize(self.matcher.embed([text for _, text, _ in pending.values()]))
+            now = time.time()
+            records = []
+            for (job_id, (job, text, content_hash)), vector in zip(pending.items(), vectors):
+                metadata = {field: job.get(field, "") for field in METADATA_FIELDS}
+                records.append((job_id, content_hash, self.matcher.backend, text,
+                                json.dumps(metadata, ensure_ascii=False), vector.tobytes(), now))
+                self._set_vector(job_id, content_hash, vector)
+
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO postings (id, content_hash, backend, text, metadata, vector, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    records,
+                )
+            return len(records)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._size
+
+    def query(self, text: str, k: int = 5, exclude_ids: set | None = None) -> list[dict]:
+        """Top-k postings most similar to ``text``; each result is the stored metadata plus ``similarity``"""
+        return self._top_k(self.matcher.embed([text])[0], k, exclude_ids or set())
+
+    def similar_to(self, job: dict, k: int = 5) -> list[dict]:
+        """Postings most like ``job`` (which need not be indexed yet), excluding itself"""
+        job_id = str(job.get("id") or "")
+        with self._lock:
+            self._ensure_loaded()
+            row = self._rows.get(job_id)
+            vector = self._matrix[row].copy() if row is not None else None
+        if vector is None:
+            vector = self.matcher.embed([posting_text(job)])[0]
+        return self._top_k(vector, k, {job_id})
+
+    def _top_k(self, vector: np.ndarray, k: int, exclude_ids: set) -> list[dict]:
+        """Score an unweighted vector against the index (weighted the same way as the matrix)"""
+        with self._lock:
+            self._ensure_loaded()
+            if not self._size:
+                return []
+            idf = self._idf()
+            weighted = self._normalize(vector * idf if idf is not None else vector)[0]
+            scores = self._weighted_matrix() @ weighted
+            ids = list(self._ids)
+
+        wanted = min(len(scores), k + len(exclude_ids))
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top])]
+        picked = [(ids[i], float(scores[i])) for i in top if ids[i] not in exclude_ids][:k]
+        if not picked:
+            return []
+
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(picked))
+            metadata = {
+                job_id: json.loads(meta)
+                for job_id, meta in conn.execute(
+                    f"SELECT id, metadata FROM postings WHERE id IN ({placeholders})",
+                    [job_id for job_id, _ in picked],
+                )
+            }
+        gone = {job_id for job_id, _ in picked if job_id not in metadata}
+        if gone:
+            # Removed by another process (e.g. the harvester expiring closed postings)
+            with self._lock:
+                self._drop_vectors(gone)
+            return self._top_k(vector, k, exclude_ids)
+        return [
+            {**metadata[job_id], "similarity": round(score, 4)}
+            for job_id, score in picked
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_job_index() -> JobVectorIndex:
+    return JobVectorIndex()
+
+
+# One background thread embeds postings fetched by interactive searches, off the request path
+_indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-index")
+
+
+def index_in_background(jobs: list[dict]) -> None:
+    """Queue postings for the similar-jobs index without waiting for them to be embedded"""
+
+    def run():
+        try:
+            get_job_index().add_jobs(jobs)
+        except Exception as e:
+            print(f"Indexing {len(jobs)} postings failed: {e}")
+
+    _indexer.submit(run)
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from utils.cache import make_cache_key, normalize_text
+from utils.config import DATA_DIR
+
+JOB_STORE_PATH = DATA_DIR / "jobs.sqlite3"
+
+# bm25() column weights: title, agency, location, description, requirements
+BM25_WEIGHTS = (5.0, 2.0, 1.0, 1.0, 2.0)
+
+_SALARY_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_FTS_TOKEN_RE = re.compile(r"\w+")
+
+
+def parse_salary_range(salary: str) -> tuple[float | None, float | None]:
+    """'54000 – 72000' -> (54000.0, 72000.0)"""
+    numbers = [float(n.replace(",", "")) for n in _SALARY_RE.findall(salary or "")]
+    if not numbers:
+        return None, None
+    return min(numbers), max(numbers)
+
+
+def fts_query(text: str, any_word: bool = False) -> str:
+    """
+    Turn free text into a safe FTS5 query (every word required, prefix match
+    on the last one). ``any_word`` ORs the words instead, for ranking.
+    """
+    tokens = _FTS_TOKEN_RE.findall(text or "")
+    if not tokens:
+        return ""
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return (" OR " if any_word else " ").join(quoted)
+
+
+class JobStore:
+    """
+    Local SQLite store of every USAJOBS posting we have seen, with an FTS5 index.
+
+    Postings are upserted by PositionID; an FTS5 table over title, agency,
+    location, description and requirements answers keyword searches with
+    BM25 ranking, filtered by salary range and closing date. ``query_log``
+    remembers when each (keyword, location) search was last refreshed from the
+    live API and ``query_results`` which postings the API returned for it, so
+    repeat searches can be served locally.
+    """
+
+    def __init__(self, db_path: str | Path = JOB_STORE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT UNIQUE NOT NULL,
+                    title TEXT, agency TEXT, location TEXT,
+                    description TEXT, requirements TEXT,
+                    salary TEXT, salary_min REAL, salary_max REAL,
+                    url TEXT, posted_date TEXT, closing_date TEXT,
+                    content_hash TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_postings_closing ON postings (closing_date);
+                CREATE INDEX IF NOT EXISTS idx_postings_posted ON postings (posted_date);
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS postings_fts USING fts5(
+                    title, agency, location, description, requirements,
+                    content='postings', content_rowid='rowid', tokenize='porter unicode61'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS postings_ai AFTER INSERT ON postings BEGIN
+                    INSERT INTO postings_fts (rowid, title, agency, location, description, requirements)
+                    VALUES (new.rowid, new.title, new.agency, new.location, new.description, new.requirements);
+                END;
+                CREATE TRIGGER IF NOT EXISTS postings_ad AFTER DELETE ON postings BEGIN
+                    INSERT INTO postings_fts (postings_fts, rowid, title, agency, location, description, requirements)
+                    VALUES ('delete', old.rowid, old.title, old.agency, old.location, old.description, old.requirements);
+                END;
+                CREATE TRIGGER IF NOT EXISTS postings_au AFTER UPDATE ON postings BEGIN
+                    INSERT INTO postings_fts (postings_fts, rowid, title, agency, location, description, requirements)
+                    VALUES ('delete', old.rowid, old.title, old.agency, old.location, old.description, old.requirements);
+                    INSERT INTO postings_fts (rowid, title, agency, location, description, requirements)
+                    VALUES (new.rowid, new.title, new.agency, new.location, new.description, new.requirements);
+                END;
+
+                CREATE TABLE IF NOT EXISTS query_log (
+                    query_key TEXT PRIMARY KEY,
+                    keyword TEXT, location TEXT,
+                    last_refreshed REAL NOT NULL,
+                    watermark TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS query_results (
+                    query_key TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (query_key, job_id)
+                );
+            """)
+
+    # ── Writes ───────────────────────────────────────
+    @staticmethod
+    def content_hash(job: dict) -> str:
+        payload = json.dumps(job, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def upsert_jobs(self, jobs: list[dict]) -> dict:
+        """
+        Insert new postings and update changed ones.
+
+        Returns counts of inserted/updated/unchanged postings plus
+        ``changed_ids``, the PositionIDs that were actually written.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "changed_ids": []}
+        now = time.time()
+        with self._connect() as conn:
+            for job in jobs:
+                job_id = str(job.get("id") or "")
+                if not job_id:
+                    continue
+                new_hash = self.content_hash(job)
+                row = conn.execute("SELECT content_hash FROM postings WHERE id = ?", (job_id,)).fetchone()
+                if row is not None and row["content_hash"] == new_hash:
+                    conn.execute("UPDATE postings SET last_seen = ? WHERE id = ?", (now, job_id))
+                    counts["unchanged"] += 1
+                    continue
+
+                salary_min, salary_max = parse_salary_range(job.get("salary", ""))
+                values = (
+                    job.get("title", ""), job.get("agency", ""), job.get("location", ""),
+                    job.get("description", ""), job.get("requirements", ""),
+                    job.get("salary", ""), salary_min, salary_max,
+                    job.get("url", ""), job.get("posted_date", ""), job.get("closing_date", ""),
+                    new_hash,
+                )
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO postings (title, agency, location, description, requirements, salary, salary_min, "
+                        "salary_max, url, posted_date, closing_date, content_hash, id, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        values + (job_id, now, now),
+                    )
+                    counts["inserted"] += 1
+                    counts["changed_ids"].append(job_id)
+                else:
+                    conn.execute(
+                        "UPDATE postings SET title = ?, agency = ?, location = ?, description = ?, requirements = ?, "
+                        "salary = ?, salary_min = ?, salary_max = ?, url = ?, posted_date = ?, closing_date = ?, "
+                        "content_hash = ?, last_seen = ? WHERE id = ?",
+                        values + (now, job_id),
+                    )
+                    counts["updated"] += 1
+                    counts["changed_ids"].append(job_id)
+        return counts
+
+    # ── Reads ────────────────────────────────────────
+    def search(self, text: str = "", location: str | None = None, min_salary: float | None = None,
+               max_salary: float | None = None, closes_after: str | None = None, limit: int = 25) -> list[dict]:
+        """
+        Full-text search ranked by BM25 (best first).
+
+        ``closes_after`` is an ISO date/datetime string; postings closing
+        earlier are excluded. Salary bounds compare against the posting's
+        advertised range (overlap semantics).
+        """
+        match_parts = []
+        if fts_query(text):
+            match_parts.append(f"{{title description requirements agency}} : ({fts_query(text)})")
+        if fts_query(location or ""):
+            match_parts.append(f"location : ({fts_query(location)})")
+
+        where, params = [], []
+        if min_salary is not None:
+            where.append("p.salary_max >= ?")
+            params.append(min_salary)
+        if max_salary is not None:
+            where.append("p.salary_min <= ?")
+            params.append(max_salary)
+        if closes_after:
+            where.append("(p.closing_date = '' OR p.closing_date >= ?)")
+            params.append(closes_after)
+
+        if match_parts:
+            sql = (
+                "SELECT p.*, bm25(postings_fts, ?, ?, ?, ?, ?) AS rank FROM postings_fts "
+                "JOIN postings p ON p.rowid = postings_fts.rowid WHERE postings_fts MATCH ?"
+            )
+            params = list(BM25_WEIGHTS) + [" AND ".join(match_parts)] + params
+            order = "ORDER BY rank"
+        else:
+            sql = "SELECT p.*, 0.0 AS rank FROM postings p WHERE 1 = 1"
+            order = "ORDER BY p.posted_date DESC"
+        if where:
+            sql += " AND " + " AND ".join(where)
+        sql += f" {order} LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "agency": row["agency"],
+            "location": row["location"],
+            "salary": row["salary"],
+            "url": row["url"],
+            "description": row["description"],
+            "requirements": row["requirements"],
+            "posted_date": row["posted_date"],
+            "closing_date": row["closing_date"],
+        }
+
+    def get_jobs(self, job_ids: list[str]) -> list[dict]:
+        if not job_ids:
+            return []
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(job_ids))
+            rows = conn.execute(f"SELECT * FROM postings WHERE id IN ({placeholders})", list(job_ids)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def expire_closed(self, before: str | None = None) -> int:
+        """
+        Delete postings whose ApplicationCloseDate is before ``before`` (ISO
+        date, default today), along with the saved query results pointing at them.
+        """
+        before = before or datetime.now().strftime("%Y-%m-%d")
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM postings WHERE closing_date != '' AND closing_date < ?", (before,))
+            conn.execute("DELETE FROM query_results WHERE job_id NOT IN (SELECT id FROM postings)")
+            return cur.rowcount
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+
+    # ── Query freshness ──────────────────────────────
+    @staticmethod
+    def query_key(keyword: str, location: str | None) -> str:
+        return make_cache_key("query", normalize_text(keyword), normalize_text(location))
+
+    def get_query_state(self, keyword: str, location: str | None) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_refreshed, watermark FROM query_log WHERE query_key = ?",
+                (self.query_key(keyword, location),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def mark_refreshed(self, keyword: str, location: str | None, watermark: str | None = None,
+                       refreshed_at: float | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO query_log (query_key, keyword, location, last_refreshed, watermark) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(query_key) DO UPDATE SET last_refreshed = excluded.last_refreshed, "
+                "watermark = COALESCE(excluded.watermark, query_log.watermark)",
+                (self.query_key(keyword, location), keyword, location or "",
+                 refreshed_at if refreshed_at is not None else time.time(), watermark),
+            )
+
+    def record_query_results(self, keyword: str, location: str | None, job_ids: list[str],
+                             replace: bool = True) -> None:
+        """
+        Remember which postings the live API returned for a query, in API
+        order. ``replace=False`` adds to the saved set (delta refreshes).
+        """
+        key = self.query_key(keyword, location)
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM query_results WHERE query_key = ?", (key,))
+            start = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM query_results WHERE query_key = ?",
+                                 (key,)).fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO query_results (query_key, job_id, position) VALUES (?, ?, ?)",
+                [(key, str(job_id), start + i) for i, job_id in enumerate(job_ids) if job_id],
+            )
+
+    def has_query_results(self, keyword: str, location: str | None) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM query_results WHERE query_key = ? LIMIT 1",
+                                (self.query_key(keyword, location),)).fetchone() is not None
+
+    def search_query_results(self, keyword: str, location: str | None, closes_after: str | None = None,
+                             limit: int = 25) -> list[dict]:
+        """
+        Postings the live API returned for (keyword, location), best first.
+
+        The API already did the matching (including location, which it
+        understands far better than our stored strings), so nothing here is
+        filtered out by text: postings are ranked by BM25 on any keyword word,
+        then in API order.
+        """
+        sql = "SELECT p.*, 0.0 AS rank FROM query_results q JOIN postings p ON p.id = q.job_id"
+        params = []
+        if fts_query(keyword):
+            sql = (
+                "SELECT p.*, COALESCE(m.rank, 0.0) AS rank FROM query_results q JOIN postings p ON p.id = q.job_id "
+                "LEFT JOIN (SELECT rowid, bm25(postings_fts, ?, ?, ?, ?, ?) AS rank FROM postings_fts "
+                "WHERE postings_fts MATCH ?) m ON m.rowid = p.rowid"
+            )
+            params = list(BM25_WEIGHTS) + [
+                f"{{title description requirements agency}} : ({fts_query(keyword, any_word=True)})"]
+        sql += " WHERE q.query_key = ?"
+        params.append(self.query_key(keyword, location))
+        if closes_after:
+            sql += " AND (p.closing_date = '' OR p.closing_date >= ?)"
+            params.append(closes_after)
+        sql += " ORDER BY rank, q.position LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def search_with_refresh(self, api, keyword: str, location: str | None, max_results: int = 25,
+                            max_age: float = 3600, on_job=None) -> list[dict]:
+        """
+        Serve a search from the local index, touching the live API only when needed.
+
+        Fresh queries (refreshed within ``max_age`` seconds) are answered
+        locally from the postings the API returned for them last time. Stale
+        ones fetch only postings from the last few days (USAJOBS
+        ``DatePosted``) and add them to that set before answering locally;
+        never-seen queries do a full live search, which also seeds the index.
+        ``on_job`` is called with each posting as it arrives from the live API.
+        """
+        state = self.get_query_state(keyword, location)
+        now = time.time()
+        closes_after = datetime.now().strftime("%Y-%m-%d")
+
+        def fetch(delta: bool = False, **kwargs) -> list[dict]:
+            jobs = []
+            for job in api.iter_jobs(keyword, location, max_results, **kwargs):
+                jobs.append(job)
+                if on_job is not None:
+                    on_job(job)
+            self.upsert_jobs(jobs)
+            # Only a successful API round trip counts as a refresh. The watermark is left alone:
+            # these are only the first max_results rows, and the harvester uses it to decide
+            # which older postings it has already pulled in
+            if api.last_search_meta:
+                self.record_query_results(keyword, location, [j.get("id") for j in jobs], replace=not delta)
+                self.mark_refreshed(keyword, location)
+            return jobs
+
+        if state is None or not self.has_query_results(keyword, location):
+            return fetch()
+
+        age = now - state["last_refreshed"]
+        if age > max_age:
+            days = min(60, max(1, math.ceil(age / 86400)))
+            delta = fetch(delta=True, extra_params={"DatePosted": days})
+            print(f"✓ Delta refresh for '{keyword}' pulled {len(delta)} postings from the last {days} day(s)")
+
+        return self.search_query_results(keyword, location, closes_after=closes_after, limit=max_results)
+
+
+@lru_cache(maxsize=1)
+def get_job_store() -> JobStore:
+    return JobStore()
@@ -0,0 +1,122 @@
+import json
+import re
+
+_CLOSERS = {"{": "}", "[": "]"}
+_STRING_CONTROL = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_DANGLING_KEY_RE = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+_DANGLING_COLON_RE = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:\s*[-\w.+]*$')
+_PARTIAL_ESCAPE_RE = re.compile(r'\\(?:u[0-9a-fA-F]{0,3})?$')
+
+
+def _close(text: str, stack: list[str]) -> str:
+    return text + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def _trim_tail(text: str, stack: list[str], at_end: bool = True) -> str:
+    """
+    Drop whatever half-written element ends a truncated object/array.
+
+    Only text that runs to the end of the (truncated) input can be half
+    written; a cut at a checkpoint (``at_end=False``) ends after a complete
+    element, so only the separating comma is removed there.
+    """
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    if at_end and stack and stack[-1] == "{":
+        # "key" or "key": or "key": tru  -> drop the key
+        text = _DANGLING_COLON_RE.sub(r"\1", text)
+        text = _DANGLING_KEY_RE.sub(r"\1", text)
+        text = text.rstrip().rstrip(",")
+    return text
+
+
+def _scan(text: str, start: int):
+    """
+    One pass over ``text`` from the ``{`` at ``start``.
+
+    Returns ``(repaired, stack, in_string, safe_points, end)``: the text with
+    raw control characters inside strings escaped and trailing commas removed;
+    the brackets still open when the input ended (empty if the object closed);
+    whether the input ended inside a string; ``(length, stack)`` checkpoints
+    taken after each complete element, used to cut a truncated value back to
+    the last whole one; and the index in ``text`` just past the object.
+    """
+    out = []
+    stack = []
+    safe_points = []
+    in_string = escaped = False
+    for end, ch in enumerate(text[start:], start + 1):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch in _STRING_CONTROL:
+                ch = _STRING_CONTROL[ch]
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            if stack:
+                ch = _CLOSERS[stack.pop()]
+            out.append(ch)
+            if not stack:
+                return "".join(out), [], False, safe_points, end
+            continue
+        elif ch == ",":
+            safe_points.append((len(out), list(stack)))
+        out.append(ch)
+    return "".join(out), stack, in_string, safe_points, len(text)
+
+
+def loads_tolerant(text: str) -> tuple[object | None, bool]:
+    """
+    Parse the first JSON object in an LLM response, repairing it if needed.
+
+    Handles markdown fences and chatter around the object, trailing commas,
+    raw newlines inside strings and output truncated mid-value (open strings
+    are closed, a half-written element is dropped, open brackets are closed).
+    Returns ``(value, repaired)``; ``value`` is None when nothing usable was
+    found.
+    """
+    if not text:
+        return None, False
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            return json.loads(stripped), False
+        except ValueError:
+            pass
+
+    start = text.find("{")
+    if start == -1:
+        return None, False
+    repaired, stack, in_string, safe_points, end = _scan(text, start)
+    if not stack:
+        try:
+            # Fences or chatter around an intact object don't count as a repair
+            return json.loads(repaired), repaired != text[start:end]
+        except ValueError:
+            # Closed but still invalid (e.g. unquoted value); try the checkpoints below
+            stack = ["{"]
+
+    candidates = []
+    if in_string:
+        candidates.append(_close(_trim_tail(_PARTIAL_ESCAPE_RE.sub("", repaired) + '"', stack), stack))
+    candidates.append(_close(_trim_tail(repaired, stack), stack))
+    for length, saved_stack in reversed(safe_points):
+        candidates.append(_close(_trim_tail(repaired[:length], saved_stack, at_end=False), saved_stack))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), True
+        except ValueError:
+            continue
+    return None, False
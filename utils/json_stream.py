@@ -0,0 +1,146 @@
+import json
+import re
+
+_PARTIAL_UNICODE_ESCAPE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+
+
+class IncrementalJSONParser:
+    """
+    Pull top-level fields out of a JSON object while it is still being streamed.
+
+    Feed raw text chunks as they arrive; ``fields`` holds every top-level value
+    that has been completed so far, plus the in-progress prefix of a string
+    value (so long text such as a cover letter can be rendered as it is
+    written). Lists and nested objects appear once they are closed. Scanning
+    resumes after the last completed field rather than from the start.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.partial_key = None
+        self.complete = False
+        self._pos = None   # index just past the last completed field
+
+    def feed(self, chunk: str) -> dict:
+        if chunk and not self.complete:
+            self.buffer += chunk
+            self._scan()
+        return self.fields
+
+    def _scan(self) -> None:
+        text = self.buffer
+        if self._pos is None:
+            start = text.find("{")
+            if start == -1:
+                return
+            self._pos = start + 1
+
+        pos = self._pos
+        self.partial_key = None
+        while True:
+            pos = self._skip(text, pos, " \t\r\n,")
+            if pos >= len(text):
+                return
+            if text[pos] == "}":
+                self.complete = True
+                return
+            if text[pos] != '"':
+                return   # not JSON we understand; wait for the final parse
+
+            key_end = self._string_end(text, pos)
+            if key_end is None:
+                return
+            key = self._decode_string(text[pos + 1:key_end])
+
+            pos = self._skip(text, key_end + 1, " \t\r\n")
+            if pos >= len(text) or text[pos] != ":":
+                return
+            pos = self._skip(text, pos + 1, " \t\r\n")
+            if pos >= len(text):
+                return
+
+            value_end, value = self._read_value(text, pos)
+            if value_end is None:
+                # Expose partial strings so callers can render them live
+                if text[pos] == '"':
+                    self.fields[key] = self._decode_string(text[pos + 1:])
+                    self.partial_key = key
+                return
+
+            self.fields[key] = value
+            pos = value_end
+            self._pos = pos
+
+    @staticmethod
+    def _skip(text: str, pos: int, chars: str) -> int:
+        while pos < len(text) and text[pos] in chars:
+            pos += 1
+        return pos
+
+    @staticmethod
+    def _string_end(text: str, start: int) -> int | None:
+        """Index of the closing quote of the string opening at ``start``"""
+        i = start + 1
+        while i < len(text):
+            ch = text[i]
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == '"':
+                return i
+            i += 1
+        return None
+
+    @staticmethod
+    def _decode_string(raw: str) -> str:
+        # Drop a dangling escape left by a chunk boundary
+        raw = _PARTIAL_UNICODE_ESCAPE.sub("", raw)
+        trailing = len(raw) - len(raw.rstrip("\\"))
+        if trailing % 2:
+            raw = raw[:-1]
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw.replace("\\n", "\n").replace('\\"', '"')
+
+    def _read_value(self, text: str, pos: int):
+        """Return (end_index, value) for a complete value at ``pos``, or (None, None)"""
+        ch = text[pos]
+        if ch == '"':
+            end = self._string_end(text, pos)
+            if end is None:
+                return None, None
+            return end + 1, self._decode_string(text[pos + 1:end])
+
+        if ch in "[{":
+            depth = 0
+            i = pos
+            while i < len(text):
+                c = text[i]
+                if c == '"':
+                    end = self._string_end(text, i)
+                    if end is None:
+                        return None, None
+                    i = end + 1
+                    continue
+                if c in "[{":
+                    depth += 1
+                elif c in "]}":
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            return i + 1, json.loads(text[pos:i + 1])
+                        except ValueError:
+                            return None, None
+                i += 1
+            return None, None
+
+        # number / true / false / null — complete once a delimiter follows
+        match = re.match(r'[^,}\]\s]+', text[pos:])
+        if not match or pos + match.end() >= len(text):
+            return None, None
+        try:
+            return pos + match.end(), json.loads(match.group(0))
+        except ValueError:
+            return None, None
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.cache import make_cache_key
+from utils.config import LLM_CACHE_PATH
+
+
+class LLMResultCache:
+    """
+    Persistent content-addressed store for LLM results, backed by SQLite.
+
+    Entries are keyed on a hash of everything that determines the output
+    (input text, model, temperature, prompt version, ...) and grouped by
+    namespace so different agents can share one database file. Namespaces
+    holding personal data can set ``ttl`` (seconds since the entry was written)
+    and ``maxsize`` (newest entries kept), enforced on every write.
+    """
+
+    def __init__(self, namespace: str, db_path: str | Path = LLM_CACHE_PATH, ttl: float | None = None,
+                 maxsize: int | None = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation so the cache is safe to share across threads"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_hit_at REAL,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        return make_cache_key(parts)
+
+    def _cutoff(self) -> float:
+        """Entries written at or before this time have expired"""
+        return time.time() - self.ttl if self.ttl is not None else float("-inf")
+
+    def get(self, key: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE namespace = ? AND key = ? AND created_at > ?",
+                (self.namespace, key, self._cutoff()),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE llm_cache SET hit_count = hit_count + 1, last_hit_at = ? WHERE namespace = ? AND key = ?",
+                    (time.time(), self.namespace, key),
+                )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, prompt_version: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (namespace, key, prompt_version, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, prompt_version, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+        if self.ttl is not None or self.maxsize is not None:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete this namespace's expired entries and all but its ``maxsize`` newest; returns rows removed"""
+        with self._connect() as conn:
+            removed = 0
+            if self.ttl is not None:
+                removed += conn.execute("DELETE FROM llm_cache WHERE namespace = ? AND created_at <= ?",
+                                        (self.namespace, self._cutoff())).rowcount
+            if self.maxsize is not None:
+                removed += conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND key NOT IN "
+                    "(SELECT key FROM llm_cache WHERE namespace = ? ORDER BY created_at DESC LIMIT ?)",
+                    (self.namespace, self.namespace, self.maxsize),
+                ).rowcount
+        return removed
+
+    def contains(self, key: str) -> bool:
+        """Check for an entry without touching hit counters"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM llm_cache WHERE namespace = ? AND key = ? AND created_at > ?",
+                (self.namespace, key, self._cutoff()),
+            ).fetchone()
+        return row is not None
+
+    def invalidate(self, keep_prompt_version: str | None = None) -> int:
+        """
+        Drop cached entries for this namespace.
+
+        With ``keep_prompt_version`` only entries produced by other prompt
+        versions are removed; returns the number of rows deleted.
+        """
+        with self._connect() as conn:
+            if keep_prompt_version is None:
+                cur = conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (self.namespace,))
+            else:
+                cur = conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND prompt_version != ?",
+                    (self.namespace, keep_prompt_version),
+                )
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, stored_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM llm_cache WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "lifetime_hits": stored_hits,
+            }
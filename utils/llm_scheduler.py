@@ -0,0 +1,319 @@
+import contextvars
+import heapq
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from utils.config import LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_SCHEDULER_PATH
+
+# Priority lanes; lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_BACKGROUND = 2
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch", PRIORITY_BACKGROUND: "background"}
+
+# Lane used by slot() when the caller doesn't pass one; set per thread with llm_priority()
+_current_priority = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+_RATE_LIMIT_MARKERS = ("429", "resource_exhausted", "resource exhausted", "rate limit", "ratelimit",
+                       "quota", "too many requests")
+_RETRY_AFTER_RE = re.compile(r"retry(?:[ _-]?(?:in|after|delay))?[\"':\s]*([\d.]+)\s*s", re.IGNORECASE)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for provider quota / 429 errors, whichever client library raised them"""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """Server-suggested wait from a 429 message ("retry in 12.5s", "retryDelay": "30s"), if any"""
+    match = _RETRY_AFTER_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the enclosed LLM calls (in this thread) in the given lane"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls, shared by every process on the host.
+
+    Two token buckets — requests/min and tokens/min — live in a small SQLite
+    file, so the web app, the harvester and the analysis worker draw on one
+    Gemini quota. Callers wait in priority lanes (interactive before batch
+    before background, FIFO within a lane): within a process only the head
+    of the local queue competes, and across processes the most urgent
+    registered head is admitted first, so a background worker gives way to a
+    user in the web app. A 429 halves the shared effective rate and pauses
+    admissions for the server's retry delay; each success then restores the
+    rate gradually (AIMD).
+    """
+
+    MIN_RATE_FACTOR = 0.1
+    # Other processes can't wake us, so queue heads re-check the shared state this often
+    POLL_INTERVAL = 0.25
+    # A registered queue head that stops polling for this long (crashed process) is ignored
+    WAITER_TTL = 5.0
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 db_path: str | Path = LLM_SCHEDULER_PATH):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_capacity = float(max(1, requests_per_minute // 6))   # ~10 s worth of burst
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._waiting = []          # local heap of (priority, seq)
+        self._seq = itertools.count()
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS bucket (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    request_tokens REAL NOT NULL,
+                    llm_tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    rate_factor REAL NOT NULL DEFAULT 1.0,
+                    paused_until REAL NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS waiters (
+                    waiter_id TEXT PRIMARY KEY,
+                    priority INTEGER NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    heartbeat REAL NOT NULL
+                );
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO bucket (id, request_tokens, llm_tokens, updated_at) VALUES (1, ?, ?, ?)",
+                (self._request_capacity, float(tokens_per_minute), time.time()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection holding the write lock, so read-modify-write of the bucket is atomic"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _read(self):
+        """Short-lived read-only connection; under WAL it never waits for a writer"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ── Buckets ──────────────────────────────────────
+    def _load_bucket(self, conn, now: float) -> dict:
+        """Shared bucket state, refilled up to ``now``"""
+        request_tokens, llm_tokens, updated_at, factor, paused_until = conn.execute(
+            "SELECT request_tokens, llm_tokens, updated_at, rate_factor, paused_until FROM bucket WHERE id = 1"
+        ).fetchone()
+        elapsed = max(0.0, now - updated_at)
+        return {
+            "request_tokens": min(self._request_capacity,
+                                  request_tokens + elapsed * self.requests_per_minute * factor / 60),
+            "llm_tokens": min(self.tokens_per_minute,
+                              llm_tokens + elapsed * self.tokens_per_minute * factor / 60),
+            "rate_factor": factor,
+            "paused_until": paused_until,
+        }
+
+    def _wait_time(self, bucket: dict, tokens: float, now: float) -> float:
+        """Seconds until a request of ``tokens`` fits both buckets (0 if it fits now)"""
+        if now < bucket["paused_until"]:
+            return bucket["paused_until"] - now
+        factor = bucket["rate_factor"]
+        waits = [0.0]
+        if bucket["request_tokens"] < 1:
+            waits.append((1 - bucket["request_tokens"]) * 60 / (self.requests_per_minute * factor))
+        if bucket["llm_tokens"] < tokens:
+            waits.append((tokens - bucket["llm_tokens"]) * 60 / (self.tokens_per_minute * factor))
+        return max(waits)
+
+    def _try_admit(self, waiter_id: str, priority: int, enqueued_at: float, tokens: float) -> float:
+        """Register as this process's queue head; take the tokens if we're the global head and they fit"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - self.WAITER_TTL,))
+            conn.execute(
+                "INSERT INTO waiters (waiter_id, priority, enqueued_at, heartbeat) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(waiter_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (waiter_id, priority, enqueued_at, now),
+            )
+            head = conn.execute("SELECT waiter_id FROM waiters ORDER BY priority, enqueued_at LIMIT 1").fetchone()
+            if head[0] != waiter_id:
+                return self.POLL_INTERVAL
+            bucket = self._load_bucket(conn, now)
+            wait = self._wait_time(bucket, tokens, now)
+            if wait > 0:
+                return wait
+            conn.execute(
+                "UPDATE bucket SET request_tokens = ?, llm_tokens = ?, updated_at = ? WHERE id = 1",
+                (bucket["request_tokens"] - 1, bucket["llm_tokens"] - tokens, now),
+            )
+            conn.execute("DELETE FROM waiters WHERE waiter_id = ?", (waiter_id,))
+        return 0.0
+
+    def _forget_waiter(self, waiter_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM waiters WHERE waiter_id = ?", (waiter_id,))
+
+    # ── Admission ────────────────────────────────────
+    def acquire(self, tokens: int = 1, priority: int | None = None) -> None:
+        """
+        Block until this call may start; ``tokens`` is the estimated prompt + output size.
+
+        The condition variable only guards the local queue: SQLite work runs
+        outside it, so a slow lock wait on the shared file never blocks the
+        other threads of this process.
+        """
+        priority = _current_priority.get() if priority is None else priority
+        tokens = min(float(tokens), float(self.tokens_per_minute))
+        entry = (priority, next(self._seq))
+        waiter_id = f"{self._owner}:{entry[1]}"
+        enqueued_at = time.time()
+        registered = admitted = False
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                with self._cond:
+                    is_head = self._waiting[0] == entry
+                    if not is_head and not registered:
+                        self._cond.wait()   # not our turn; woken when the local head changes
+                        continue
+                if not is_head:
+                    # Overtaken by a more urgent local call; it competes across processes now
+                    self._forget_waiter(waiter_id)
+                    registered = False
+                    continue
+                registered = True
+                wait = self._try_admit(waiter_id, priority, enqueued_at, tokens)
+                if wait <= 0:
+                    admitted = True
+                    break
+                with self._cond:
+                    if self._waiting[0] == entry:
+                        self._cond.wait(min(wait, self.POLL_INTERVAL))
+        finally:
+            with self._cond:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                if admitted:
+                    self.in_flight += 1
+                    self.admitted += 1
+                self._cond.notify_all()
+            if registered and not admitted:
+                self._forget_waiter(waiter_id)
+
+    def release(self, error: BaseException | None = None) -> None:
+        rate_limited = error is not None and is_rate_limit_error(error)
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.rate_limited += 1
+        if rate_limited:
+            with self._connect() as conn:
+                factor, paused_until = conn.execute(
+                    "SELECT rate_factor, paused_until FROM bucket WHERE id = 1").fetchone()
+                factor = max(self.MIN_RATE_FACTOR, factor / 2)
+                delay = retry_after_seconds(error) or 60 / max(1.0, self.requests_per_minute * factor)
+                conn.execute("UPDATE bucket SET rate_factor = ?, paused_until = ? WHERE id = 1",
+                             (factor, max(paused_until, time.time() + delay)))
+            print(f"[LLM] Rate limited — pausing {delay:.1f}s, running at {factor:.0%} of configured rate")
+        elif error is None:
+            with self._connect() as conn:
+                conn.execute("UPDATE bucket SET rate_factor = MIN(1.0, rate_factor + 0.05) "
+                             "WHERE id = 1 AND rate_factor < 1.0")
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 1, priority: int | None = None):
+        """
+        ``with scheduler.slot(estimated_tokens):`` around a single LLM call.
+
+        Exceptions propagate unchanged; rate-limit errors also slow the
+        scheduler down for every other caller.
+        """
+        self.acquire(tokens, priority)
+        try:
+            yield
+        except BaseException as e:
+            self.release(e)
+            raise
+        else:
+            self.release()
+
+    @property
+    def rate_factor(self) -> float:
+        with self._read() as conn:
+            return conn.execute("SELECT rate_factor FROM bucket WHERE id = 1").fetchone()[0]
+
+    def queue_depth(self) -> dict:
+        """Calls waiting in this process, per lane"""
+        with self._cond:
+            depth = {name: 0 for name in LANE_NAMES.values()}
+            for priority, _ in self._waiting:
+                lane = LANE_NAMES.get(priority, str(priority))
+                depth[lane] = depth.get(lane, 0) + 1
+            return depth
+
+    def stats(self) -> dict:
+        depth = self.queue_depth()
+        now = time.time()
+        with self._read() as conn:
+            factor, paused_until = conn.execute("SELECT rate_factor, paused_until FROM bucket WHERE id = 1").fetchone()
+            elsewhere = conn.execute(
+                "SELECT COUNT(*) FROM waiters WHERE heartbeat >= ? AND waiter_id NOT LIKE ?",
+                (now - self.WAITER_TTL, f"{self._owner}:%"),
+            ).fetchone()[0]
+        with self._cond:
+            return {
+                "queued": depth,
+                "queued_total": sum(depth.values()),
+                "waiting_elsewhere": elsewhere,
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "rate_factor": round(factor, 2),
+                "paused_for": round(max(0.0, paused_until - now), 1),
+            }
+
+
+@lru_cache(maxsize=1)
+def get_llm_scheduler() -> LLMScheduler:
+    return LLMScheduler()
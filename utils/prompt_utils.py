@@ -0,0 +1,75 @@
+from utils.rate_limit import estimate_tokens
+
+# Sections of a JobDescriptionAnalyst result, in the order they are worth sending
+ANALYSIS_SECTIONS = [
+    ("must_have_requirements", "MUST-HAVE REQUIREMENTS"),
+    ("preferred_skills", "PREFERRED SKILLS"),
+    ("key_responsibilities", "KEY RESPONSIBILITIES"),
+    ("keywords_for_ats", "ATS KEYWORDS"),
+    ("company_culture_indicators", "CULTURE INDICATORS"),
+    ("red_flags", "RED FLAGS"),
+    ("positioning_strategy", "POSITIONING STRATEGY"),
+]
+
+# Analysis fields whose terms decide which resume sections are relevant to a job
+RELEVANCE_FIELDS = ("keywords_for_ats", "must_have_requirements", "preferred_skills")
+
+
+def _dedupe(items: list) -> list:
+    seen = set()
+    unique = []
+    for item in items:
+        text = " ".join(str(item).split())
+        key = text.lower()
+        if text and key not in seen:
+            seen.add(key)
+            unique.append(text)
+    return unique
+
+
+def _cap_tokens(items: list[str], max_tokens: int) -> list[str]:
+    """Keep whole items until the section's token allowance is used up"""
+    kept = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item) + 1
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    return kept
+
+
+def compact_job_analysis(analysis: dict, max_items: int = 12, max_section_tokens: int = 200) -> str:
+    """
+    Serialize a job analysis for use inside generation prompts.
+
+    Only the known analysis sections are emitted (debug fields such as
+    ``raw_response`` are dropped), list entries are deduplicated
+    case-insensitively, and each section is capped at ``max_items`` entries
+    and roughly ``max_section_tokens`` tokens. The output is plain labelled
+    lines, which is far smaller than pretty-printed JSON.
+    """
+    lines = []
+    for key, label in ANALYSIS_SECTIONS:
+        value = analysis.get(key)
+        if not value:
+            continue
+        if isinstance(value, list):
+            items = _cap_tokens(_dedupe(value)[:max_items], max_section_tokens)
+            if items:
+                lines.append(f"{label}: " + "; ".join(items))
+        else:
+            text = " ".join(str(value).split())
+            lines.append(f"{label}: {text[: max_section_tokens * 4]}")
+    return "\n".join(lines)
+
+
+def analysis_keywords(analysis: dict, max_items: int = 40) -> list[str]:
+    """Deduplicated ATS keywords, requirements and preferred skills from a job analysis"""
+    items = []
+    for key in RELEVANCE_FIELDS:
+        value = analysis.get(key) or []
+        if isinstance(value, list):
+            items.extend(value)
+    return _dedupe(items)[:max_items]
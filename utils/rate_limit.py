@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (~4 characters per token for English text)"""
+    return max(1, len(text or "") // 4)
+
+
+class RateLimiter:
+    """Thread-safe token-bucket limiter: at most ``per_minute`` acquisitions per minute, with bursts up to ``burst``"""
+
+    def __init__(self, per_minute: float, burst: int | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(per_minute // 6) or 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1) -> None:
+        """Block until ``amount`` tokens are available"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TokenBudget:
+    """Running LLM token allowance shared by the workers of a batch"""
+
+    def __init__(self, limit: int | None):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self, tokens: int) -> bool:
+        with self._lock:
+            if self.limit is not None and self.used + tokens > self.limit:
+                return False
+            self.used += tokens
+            return True
+
+    @property
+    def remaining(self) -> int | None:
+        with self._lock:
+            return None if self.limit is None else max(0, self.limit - self.used)
@@ -0,0 +1,232 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import pdfplumber
+
+from utils.config import RESUME_CACHE_PATH, RESUME_CACHE_TTL, RESUME_CACHE_MAXSIZE
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:   # optional: fast text-only backend (installed with recent pdfplumber)
+    pdfium = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:   # optional: pure-Python text-only backend
+    PdfReader = None
+
+# Bump when extraction output changes so cached text is re-extracted
+EXTRACTOR_VERSION = "1"
+
+# Documents with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = 16
+MAX_EXTRACT_WORKERS = 4
+
+
+# ── Backends ─────────────────────────────────────────
+# Each takes the raw PDF bytes and a page range and returns one string per page.
+# They are module-level functions so they can run in a process pool.
+
+def _pdfium_pages(data: bytes, start: int, stop: int) -> list[str]:
+    pdf = pdfium.PdfDocument(data)
+    try:
+        pages = []
+        for i in range(start, min(stop, len(pdf))):
+            page = pdf[i]
+            textpage = None
+            try:
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+            finally:
+                if textpage is not None:
+                    textpage.close()
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def _pypdf_pages(data: bytes, start: int, stop: int) -> list[str]:
+    reader = PdfReader(io.BytesIO(data))
+    return [page.extract_text() or "" for page in reader.pages[start:stop]]
+
+
+def _pdfplumber_pages(data: bytes, start: int, stop: int) -> list[str]:
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:stop]]
+
+
+def _page_count(backend: str, data: bytes) -> int:
+    if backend == "pdfium":
+        pdf = pdfium.PdfDocument(data)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if backend == "pypdf":
+        return len(PdfReader(io.BytesIO(data)).pages)
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+BACKENDS = {
+    "pdfium": _pdfium_pages,
+    "pypdf": _pypdf_pages,
+    "pdfplumber": _pdfplumber_pages,
+}
+
+
+def available_backends() -> list[str]:
+    """Fastest first; pdfplumber is always last as the most tolerant fallback"""
+    names = []
+    if pdfium is not None:
+        names.append("pdfium")
+    if PdfReader is not None:
+        names.append("pypdf")
+    names.append("pdfplumber")
+    return names
+
+
+def _extract_with(backend: str, data: bytes, parallel_threshold: int) -> list[str]:
+    """Extract every page exactly once, fanning out across processes for long documents"""
+    extract = BACKENDS[backend]
+    page_count = _page_count(backend, data)
+    workers = min(MAX_EXTRACT_WORKERS, os.cpu_count() or 1)
+    if page_count < parallel_threshold or workers < 2:
+        return extract(data, 0, page_count)
+
+    chunk = -(-page_count // workers)
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        parts = executor.map(extract, [data] * len(ranges), *zip(*ranges))
+        return [text for part in parts for text in part]
+
+
+def extract_pdf_pages(data: bytes, backend: str | None = None,
+                      parallel_threshold: int = PARALLEL_PAGE_THRESHOLD) -> tuple[list[str], str]:
+    """
+    Return ``(page_texts, backend_used)`` for a PDF.
+
+    Tries the fast text-only backends first and falls back to pdfplumber when
+    one fails or finds no text at all.
+    """
+    candidates = [backend] if backend else available_backends()
+    last_error = None
+    for name in candidates:
+        try:
+            pages = _extract_with(name, data, parallel_threshold)
+        except Exception as e:
+            print(f"[RESUME] {name} extraction failed: {e}")
+            last_error = e
+            continue
+        if any(p.strip() for p in pages) or name == candidates[-1]:
+            return pages, name
+    raise ValueError(f"Could not extract text from PDF: {last_error}")
+
+
+# ── Cache ────────────────────────────────────────────
+class ResumeTextCache:
+    """
+    Extracted resume text and per-page layout keyed by a hash of the uploaded bytes.
+
+    The text is personal data, so entries expire ``ttl`` seconds after they
+    were extracted and at most ``maxsize`` of the newest are kept.
+    """
+
+    def __init__(self, db_path: str | Path = RESUME_CACHE_PATH, ttl: float = RESUME_CACHE_TTL,
+                 maxsize: int = RESUME_CACHE_MAXSIZE):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS resumes (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+        self.prune()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM resumes WHERE key = ? AND created_at > ?",
+                               (key, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO resumes (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+        self.prune()
+
+    def prune(self) -> int:
+        """Delete expired entries and all but the ``maxsize`` newest; returns the number removed"""
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM resumes WHERE created_at <= ?", (time.time() - self.ttl,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM resumes WHERE key NOT IN (SELECT key FROM resumes ORDER BY created_at DESC LIMIT ?)",
+                (self.maxsize,),
+            ).rowcount
+        return removed
+
+
+@lru_cache(maxsize=1)
+def get_resume_cache() -> ResumeTextCache:
+    return ResumeTextCache()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def ingest_resume_pdf(data: bytes, use_cache: bool = True) -> dict:
+    """
+    Extract a resume PDF once per distinct file.
+
+    Returns ``{"hash", "text", "pages", "page_count", "backend"}`` where
+    ``pages`` keeps each page's text separately. Results are cached on disk by
+    a SHA-256 of the bytes, so re-uploads and Streamlit reruns are free.
+    """
+    digest = content_hash(data)
+    key = f"{digest}:{EXTRACTOR_VERSION}"
+    cache = get_resume_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    start = time.perf_counter()
+    pages, backend = extract_pdf_pages(data)
+    result = {
+        "hash": digest,
+        "text": "\n".join(p.strip() for p in pages if p.strip()),
+        "pages": pages,
+        "page_count": len(pages),
+        "backend": backend,
+    }
+    print(f"[RESUME] Extracted {len(pages)} page(s) with {backend} in {time.perf_counter() - start:.2f}s")
+    if cache is not None:
+        cache.set(key, result)
+    return result
@@ -0,0 +1,203 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from utils.ats_matcher import KeywordMatcher, TokenIndex, build_index
+from utils.rate_limit import estimate_tokens
+
+# Canonical section name -> headings that introduce it (lower-case, without trailing ':')
+SECTION_ALIASES = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me", "executive summary"),
+    "skills": ("skills", "technical skills", "core competencies", "competencies", "key skills",
+               "areas of expertise", "technologies", "tools"),
+    "experience": ("experience", "professional experience", "work experience", "work history",
+                   "employment", "employment history", "relevant experience", "federal experience"),
+    "education": ("education", "education and training", "academic background"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses"),
+    "projects": ("projects", "selected projects", "personal projects", "key projects"),
+    "awards": ("awards", "honors", "honors and awards", "achievements"),
+    "publications": ("publications", "presentations"),
+    "volunteer": ("volunteer", "volunteer experience", "community involvement", "leadership"),
+    "clearance": ("clearance", "security clearance"),
+}
+_HEADING_LOOKUP = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# Always sent to the writer; other sections are included when they match the job
+CORE_SECTIONS = ("header", "summary", "skills", "experience", "education")
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•▪◦●‣–]|\d+[.)])\s+")
+# Separators between skills, ignoring any inside parentheses: "AWS (EC2, S3), Docker"
+_SKILL_SPLIT_RE = re.compile(r"[,;|•·](?![^()]*\))")
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s+\d{{4}}|\d{{1,2}}/\d{{4}}|\d{{4}})"
+DATE_RANGE_RE = re.compile(
+    rf"(?P<start>{_DATE})\s*(?:-|–|—|to)\s*(?P<end>{_DATE}|present|current|now)", re.IGNORECASE
+)
+
+
+class ResumeSection:
+    """One block of a resume under a single heading"""
+
+    def __init__(self, name: str, heading: str, lines: list[str]):
+        self.name = name            # canonical name, e.g. "experience"; "header" for the contact block
+        self.heading = heading      # heading as written in the resume
+        self.lines = lines
+        self.bullets = [_BULLET_RE.sub("", line) for line in lines if _BULLET_RE.match(line)]
+        self.text = "\n".join(lines)
+        self.tokens = estimate_tokens(self.text)
+
+    def __repr__(self) -> str:
+        return f"ResumeSection({self.name!r}, {len(self.lines)} lines)"
+
+
+def _known_heading(text: str) -> str | None:
+    return _HEADING_LOOKUP.get(" ".join(text.lower().replace("&", "and").split()))
+
+
+def classify_heading(line: str) -> str | None:
+    """Canonical section name if ``line`` looks like a section heading, else None"""
+    stripped = line.strip().rstrip(":").strip()
+    if not stripped or len(stripped) > 40 or _BULLET_RE.match(line):
+        return None
+    known = _known_heading(stripped)
+    if known:
+        return known
+    if stripped.isupper() and len(stripped) > 2 and not any(c.isdigit() for c in stripped):
+        return "other"
+    return None
+
+
+class ParsedResume:
+    """
+    Structured view of a plain-text resume, built once and shared by every consumer.
+
+    ``sections`` keeps the resume's own order (the lines before the first
+    heading become a "header" section); ``skills`` are the individual entries
+    of the skills section(s); ``dates`` are the date ranges found anywhere
+    (e.g. ``("Jan 2020", "Present")``); ``index`` is the ATS TokenIndex of the
+    whole text.
+    """
+
+    def __init__(self, text: str):
+        self.text = (text or "").strip()
+        self.hash = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        self.sections = self._split_sections(self.text)
+        self.skills = self._extract_skills()
+        self.dates = [(m.group("start"), m.group("end")) for m in DATE_RANGE_RE.finditer(self.text)]
+        self.index = build_index(self.text)
+        self.word_count = len(self.text.split())
+        self._section_indexes = {}
+
+    @staticmethod
+    def _split_sections(text: str) -> list[ResumeSection]:
+        sections = []
+        name, heading, lines = "header", "", []
+        for raw in text.splitlines():
+            line = raw.rstrip()
+            if not line.strip():
+                continue
+            found = classify_heading(line)
+            # The first line of an all-caps resume is usually the candidate's name, not a heading
+            if found and not (found == "other" and not sections and not lines):
+                if lines or heading:
+                    sections.append(ResumeSection(name, heading, lines))
+                name, heading, lines = found, line.strip().rstrip(":"), []
+                continue
+            # Inline heading such as "Skills: Python, SQL" (a label within the current section stays put)
+            label, sep, rest = line.partition(":")
+            inline = _known_heading(label) if sep and rest.strip() else None
+            if inline and inline != name:
+                if lines or heading:
+                    sections.append(ResumeSection(name, heading, lines))
+                name, heading, lines = inline, label.strip(), [rest.strip()]
+                continue
+            lines.append(line.strip())
+        if lines or heading:
+            sections.append(ResumeSection(name, heading, lines))
+        return sections
+
+    def _extract_skills(self) -> list[str]:
+        skills, seen = [], set()
+        for section in self.sections:
+            if section.name != "skills":
+                continue
+            for line in section.lines:
+                line = _BULLET_RE.sub("", line)
+                # "Cloud & DevOps: AWS, Docker" -> drop the category label
+                if ":" in line and len(line.split(":", 1)[0]) < 30:
+                    line = line.split(":", 1)[1]
+                for skill in _SKILL_SPLIT_RE.split(line):
+                    skill = skill.strip(" .")
+                    if skill and len(skill) < 60 and skill.lower() not in seen:
+                        seen.add(skill.lower())
+                        skills.append(skill)
+        return skills
+
+    def section(self, name: str) -> ResumeSection | None:
+        return next((s for s in self.sections if s.name == name), None)
+
+    def section_index(self, position: int) -> TokenIndex:
+        if position not in self._section_indexes:
+            self._section_indexes[position] = TokenIndex(self.sections[position].text)
+        return self._section_indexes[position]
+
+    def section_relevance(self, keywords: list[str]) -> list[int]:
+        """Per-section keyword score (2 exact / 1 partial per keyword, as in ATS scoring)"""
+        matcher = KeywordMatcher(keywords)
+        return [
+            sum(score for _, score in matcher.match(self.section_index(i)))
+            for i in range(len(self.sections))
+        ]
+
+    def prompt_text(self, keywords: list[str] | None = None, max_tokens: int | None = None) -> str:
+        """
+        Compact resume text for a prompt.
+
+        With no ``keywords`` every section is included. Otherwise the core
+        sections are always kept and the rest only if they mention at least one
+        keyword; when ``max_tokens`` is set, the least relevant optional sections
+        are dropped until the text fits. Original section order is preserved.
+        """
+        keep = list(range(len(self.sections)))
+        if keywords:
+            relevance = self.section_relevance(keywords)
+            keep = [i for i in keep if self.sections[i].name in CORE_SECTIONS or relevance[i] > 0]
+            if max_tokens is not None:
+                optional = sorted((i for i in keep if self.sections[i].name not in CORE_SECTIONS),
+                                  key=lambda i: relevance[i])
+                total = sum(self.sections[i].tokens for i in keep)
+                while optional and total > max_tokens:
+                    dropped = optional.pop(0)
+                    keep.remove(dropped)
+                    total -= self.sections[dropped].tokens
+
+        blocks = []
+        for i in keep:
+            section = self.sections[i]
+            blocks.append("\n".join(([section.heading.upper()] if section.heading else []) + section.lines))
+        return "\n\n".join(blocks)
+
+    def to_dict(self) -> dict:
+        return {
+            "hash": self.hash,
+            "sections": [
+                {"name": s.name, "heading": s.heading, "bullets": len(s.bullets), "tokens": s.tokens}
+                for s in self.sections
+            ],
+            "skills": self.skills,
+            "dates": self.dates,
+            "word_count": self.word_count,
+        }
+
+
+@lru_cache(maxsize=32)
+def parse_resume(text: str) -> ParsedResume:
+    """Cached parse, so every agent and scorer shares one ParsedResume per resume text"""
+    return ParsedResume(text)
+
+
+def as_parsed_resume(resume) -> ParsedResume:
+    """Accept either raw resume text or an already parsed resume"""
+    return resume if isinstance(resume, ParsedResume) else parse_resume(resume or "")
@@ -0,0 +1,170 @@
+import typing
+from functools import lru_cache
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+
+from utils.json_repair import loads_tolerant
+
+# Output models for the agents. Every field is required so the provider's
+# JSON-schema mode always emits the full object; parse_llm_output() is lenient
+# locally and reports whatever is still missing or malformed.
+
+
+class JobAnalysis(BaseModel):
+    job_title: str
+    agency: str
+    must_have_requirements: list[str]
+    preferred_skills: list[str]
+    key_responsibilities: list[str]
+    company_culture_indicators: list[str]
+    keywords_for_ats: list[str]
+    red_flags: list[str]
+    positioning_strategy: str
+
+
+class TailoredResume(BaseModel):
+    customized_resume: str
+    summary_of_changes: str
+    keywords_added: list[str]
+    ats_score_improvement: str
+    recommended_further_improvements: list[str]
+
+
+class CoverLetter(BaseModel):
+    cover_letter: str
+    cover_letter_approach: str
+    key_points_highlighted: list[str]
+    tone_analysis: str
+    recommended_modifications: list[str]
+
+
+class SectionRewrite(BaseModel):
+    text: str
+    keywords_added: list[str] = []
+    changes: str = ""
+
+
+class TailoredSections(BaseModel):
+    # Keyed by section id; providers get sections_schema() instead (open-ended maps aren't portable)
+    sections: dict[str, SectionRewrite]
+
+
+@lru_cache(maxsize=None)
+def partial_schema(schema: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """Model with just ``fields`` of ``schema`` (all required), for follow-up requests that fill gaps"""
+    return create_model(f"{schema.__name__}Fields",
+                        **{name: (schema.model_fields[name].annotation, ...) for name in fields})
+
+
+@lru_cache(maxsize=256)
+def sections_schema(section_ids: tuple[str, ...]) -> type[BaseModel]:
+    """Provider-side shape of TailoredSections for one request: exactly ``section_ids``, each required"""
+    sections = create_model("SectionsById", **{section_id: (SectionRewrite, ...) for section_id in section_ids})
+    return create_model("TailoredSectionsById", sections=(sections, ...))
+
+
+def _coerce(value, annotation):
+    """Nudge the usual LLM type slips (bare string for a list or object, list for a string) into shape"""
+    origin = typing.get_origin(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if isinstance(value, str):
+            return {next(iter(annotation.model_fields)): value}
+    elif annotation is str:
+        if isinstance(value, list):
+            return "\n".join(str(v) for v in value if v is not None)
+        if isinstance(value, (int, float)):
+            return str(value)
+    elif origin is list and typing.get_args(annotation) == (str,):
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        if isinstance(value, list):
+            return [v if isinstance(v, str) else ", ".join(map(str, v.values())) if isinstance(v, dict) else str(v)
+                    for v in value if v is not None]
+    return value
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _empty(annotation):
+    origin = typing.get_origin(annotation) or annotation
+    return {list: [], dict: {}, str: ""}.get(origin)
+
+
+def _dump(value):
+    return value.model_dump() if isinstance(value, BaseModel) else value
+
+
+def validate_output(schema: type[BaseModel], data: dict) -> tuple[dict, list[str]]:
+    """
+    Validate ``data`` against ``schema`` one field at a time.
+
+    Returns ``(clean, problems)``: every schema field is present in ``clean``
+    (invalid or missing ones replaced by the field's default or an empty
+    value), keys outside the schema are kept as-is, and ``problems`` lists the
+    fields that were missing or could not be validated.
+    """
+    clean = dict(data)
+    problems = []
+    for name, field in schema.model_fields.items():
+        fallback = field.get_default(call_default_factory=True) if not field.is_required() else _empty(field.annotation)
+        if name not in data or data[name] is None:
+            clean[name] = fallback
+            if field.is_required():
+                problems.append(name)
+            continue
+        if typing.get_origin(field.annotation) is dict and isinstance(data[name], dict):
+            # Keep the valid entries of a map (e.g. one malformed section shouldn't discard the rest)
+            value_type = typing.get_args(field.annotation)[1]
+            entries = {}
+            for key, item in data[name].items():
+                try:
+                    entries[key] = _dump(_field_adapter(value_type).validate_python(_coerce(item, value_type)))
+                except ValidationError:
+                    pass
+            clean[name] = entries
+            if len(entries) < len(data[name]):
+                problems.append(name)
+            continue
+        try:
+            clean[name] = _dump(_field_adapter(field.annotation).validate_python(_coerce(data[name], field.annotation)))
+        except ValidationError:
+            clean[name] = fallback
+            problems.append(name)
+    return clean, problems
+
+
+def parse_llm_output(text: str, schema: type[BaseModel] | None = None) -> dict:
+    """
+    Parse an LLM response into a dict in a single local pass.
+
+    Truncated or slightly malformed JSON is repaired rather than rejected
+    (``"repaired": True`` is set). With a ``schema`` the result is validated
+    field by field; fields that were missing or invalid are listed under
+    ``"missing_fields"``. Only a response with no JSON object at all yields an
+    ``{"error": ...}`` dict.
+    """
+    data, repaired = loads_tolerant(text)
+    if not isinstance(data, dict):
+        return {"error": "No JSON object found in response", "raw_response": (text or "")[:1500]}
+    if schema is not None:
+        data, problems = validate_output(schema, data)
+        if problems:
+            data["missing_fields"] = problems
+    if repaired:
+        data["repaired"] = True
+    return data
+
+
+def output_text(result) -> str:
+    """Response text from a crewai/langchain result, serialising a structured (pydantic) result"""
+    if hasattr(result, "raw"):   # crewai LiteAgentOutput / TaskOutput
+        structured = getattr(result, "pydantic", None)
+        return structured.model_dump_json() if isinstance(structured, BaseModel) else str(result.raw)
+    if hasattr(result, "content"):   # langchain message
+        return str(result.content)
+    if isinstance(result, BaseModel):   # LLM.call(..., response_model=...)
+        return result.model_dump_json()
+    return str(result)
@@ -0,0 +1,196 @@
+import hashlib
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from utils.ats_matcher import STOPWORDS, stem, tokenize
+from utils.config import CACHE_DIR, SEMANTIC_MODEL
+from utils.resume_parser import ParsedResume, as_parsed_resume
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:   # optional: fall back to hashed TF-IDF
+    SentenceTransformer = None
+
+EMBEDDINGS_DB_PATH = CACHE_DIR / "embeddings.sqlite3"
+HASH_DIM = 4096
+
+
+class HashingEmbedder:
+    """
+    Dependency-free text vectors: stemmed unigrams and bigrams hashed into a
+    fixed number of buckets with sublinear term frequency.
+
+    The space is fixed, so vectors can be cached and compared across runs;
+    IDF weighting is applied over whichever corpus is being ranked.
+    """
+
+    name = f"hash-tf-v2-{HASH_DIM}"   # bump when tokenization or stemming changes
+    needs_idf = True
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = [stem(t) for t in tokenize(text) if t not in STOPWORDS]
+            grams = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+            for gram in grams:
+                vectors[row, zlib.crc32(gram.encode("utf-8")) % HASH_DIM] += 1.0
+        np.log1p(vectors, out=vectors)
+        return vectors
+
+
+class SentenceEmbedder:
+    """Small CPU-friendly sentence-transformers model, used when the package is installed"""
+
+    needs_idf = False
+
+    def __init__(self, model_name: str):
+        self.name = f"st-{model_name}"
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=32, normalize_embeddings=True, show_progress_bar=False),
+            dtype=np.float32,
+        )
+
+
+class EmbeddingStore:
+    """Disk cache of vectors keyed by (backend, content hash)"""
+
+    def __init__(self, db_path: str | Path = EMBEDDINGS_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    backend TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def content_key(backend: str, text: str) -> str:
+        return hashlib.sha256(f"{backend}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict:
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, dim, blob in conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+        return found
+
+    def put_many(self, backend: str, items: dict) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, backend, dim, vector) VALUES (?, ?, ?, ?)",
+                [(key, backend, len(vec), np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items.items()],
+            )
+
+
+def idf_weights(doc_freq: np.ndarray, n_docs: int) -> np.ndarray:
+    """Smoothed IDF for each vector dimension, given how many of ``n_docs`` documents use it"""
+    return np.log((1 + n_docs) / (1 + doc_freq)).astype(np.float32) + 1.0
+
+
+class SemanticMatcher:
+    """
+    Rank job postings by semantic similarity to a resume without any LLM calls.
+
+    Posting texts and resume sections are embedded once (vectors are cached on
+    disk by content hash) and every posting is scored against the whole resume
+    and its best-matching section with a single matrix multiply.
+    """
+
+    def __init__(self, model_name: str | None = SEMANTIC_MODEL, store: EmbeddingStore | None = None):
+        self.embedder = None
+        if model_name and SentenceTransformer is not None:
+            try:
+                self.embedder = SentenceEmbedder(model_name)
+            except Exception as e:
+                print(f"Could not load embedding model '{model_name}', using TF-IDF fallback: {e}")
+        if self.embedder is None:
+            self.embedder = HashingEmbedder()
+        self.store = store or EmbeddingStore()
+
+    @property
+    def backend(self) -> str:
+        return self.embedder.name
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Raw (un-weighted) vectors for ``texts``, computed only for content not already cached"""
+        keys = [EmbeddingStore.content_key(self.backend, t) for t in texts]
+        cached = self.store.get_many(list(set(keys)))
+        missing = {k: t for k, t in zip(keys, texts) if k not in cached}
+        if missing:
+            new_vectors = self.embedder.embed(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self.store.put_many(self.backend, fresh)
+            cached.update(fresh)
+        return np.vstack([cached[k] for k in keys]) if keys else np.zeros((0, 1), dtype=np.float32)
+
+    def _normalize(self, matrix: np.ndarray, idf: np.ndarray | None = None) -> np.ndarray:
+        if idf is not None:
+            matrix = matrix * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def rank_jobs(self, resume: str | ParsedResume, jobs: list[dict], job_text=None) -> list[tuple[dict, float]]:
+        """
+        Return ``(job, similarity)`` pairs sorted best first; similarity is in [0, 1].
+
+        ``resume`` is resume text or a ParsedResume; its sections (other than
+        the contact header) are the units for the best-section score.
+        ``job_text`` maps a job dict to the text to embed (defaults to title,
+        requirements and description).
+        """
+        parsed = as_parsed_resume(resume)
+        if not jobs or not parsed.text:
+            return [(job, 0.0) for job in jobs]
+        job_text = job_text or (lambda j: f"{j.get('title', '')}\n{j.get('requirements', '')}\n{j.get('description', '')}")
+
+        sections = [section.text for section in parsed.sections
+                    if section.name != "header" and len(section.text.split()) >= 5]
+        resume_texts = [parsed.text] + sections
+        job_vectors = self.embed([job_text(j) for j in jobs])
+        resume_vectors = self.embed(resume_texts)
+
+        idf = None
+        if self.embedder.needs_idf:
+            corpus = np.vstack([job_vectors, resume_vectors[:1]])
+            idf = idf_weights(np.count_nonzero(corpus, axis=0), len(corpus))
+
+        sims = self._normalize(job_vectors, idf) @ self._normalize(resume_vectors, idf).T
+        whole = sims[:, 0]
+        best_section = sims[:, 1:].max(axis=1) if sims.shape[1] > 1 else whole
+        scores = np.clip(0.5 * whole + 0.5 * best_section, 0.0, 1.0)
+
+        order = np.argsort(-scores)
+        return [(jobs[i], round(float(scores[i]), 4)) for i in order]
+
+
+@lru_cache(maxsize=1)
+def get_semantic_matcher() -> SemanticMatcher:
+    """Process-wide matcher so the embedding model is only loaded once"""
+    return SemanticMatcher()
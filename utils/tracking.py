@@ -1,12 +1,17 @@
 import os
 import csv
 from datetime import datetime
-from utils.config import COVER_LETTERS_DIR,APPLICATIONS_LOG_PATH
+from utils.config import COVER_LETTERS_DIR,APPLICATIONS_LOG_PATH,TAILORED_RESUMES_DIR
 
-def save_cover_letter_file(cover_letter_text:str,job_title:str,agency:str)->str:
-    timestamp=datetime.now().strftime("%Y%m%d_%H%M%S")
+def _safe_title(job_title:str)->str:
     safe_job_title="".join(c for c in job_title if c.isalnum() or c in (' ','-','_')).rstrip()
-    safe_job_title=safe_job_title.replace(' ','_')[:50]
+    return safe_job_title.replace(' ','_')[:50]
+def save_cover_letter_file(cover_letter_text:str,job_title:str,agency:str,job_id:str="")->str:
+    timestamp=datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_job_title=_safe_title(job_title)
+    # job_id keeps batch-generated files for same-titled postings apart
+    if job_id:
+        safe_job_title=f"{safe_job_title}_{_safe_title(str(job_id))}"
     filename=f"cover_letter_{safe_job_title}_{timestamp}.txt"
     filepath=os.path.join(COVER_LETTERS_DIR,filename)
     with open(filepath,'w',encoding='utf-8') as f:
@@ -17,6 +22,17 @@ def save_cover_letter_file(cover_letter_text:str,job_title:str,agency:str)->str:
         f.write(cover_letter_text)
     print(f"Cover letter saved to :{filepath}")
     return filepath
+def save_tailored_resume_file(resume_text:str,job_title:str,agency:str,job_id:str="")->str:
+    timestamp=datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_job_title=_safe_title(job_title)
+    if job_id:
+        safe_job_title=f"{safe_job_title}_{_safe_title(str(job_id))}"
+    filename=f"resume_{safe_job_title}_{timestamp}.txt"
+    filepath=os.path.join(TAILORED_RESUMES_DIR,filename)
+    with open(filepath,'w',encoding='utf-8') as f:
+        f.write(resume_text)
+    print(f"Tailored resume saved to :{filepath}")
+    return filepath
 def log_application(job_id:str,job_title:str,agency:str,resume_summary:str,cover_letter_path:str,status:str="applied")->None:
      """
     Log application details to the applications log CSV file